@@ -0,0 +1,268 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 13:40
+#           @file: agent.py
+#          @brief: Headless sampling agent streaming samples to subscribers
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 13:40:00
+# *****************************************************
+
+import os
+import sys
+import time
+import queue
+import signal
+import socket
+import logging
+import threading
+from typing import List
+from utils.sampler import (ProcessSampler, MemoryContext, SmapsBreakdown, AdaptiveInterval, TickScheduler, Sample,
+                           format_record)
+from utils.sampler import LOG_FORMAT, LOG_DATE_FORMAT
+from utils.wire import FrameEncoder, parse_address
+from utils.exporter import MetricsExporter
+from utils.archive import ArchiveWriter
+
+
+class SampleServer(object):
+    """ Accept subscribers and broadcast encoded sample batches to them
+
+    Every subscriber has its own encoder since deltas are relative to the state of the connection, and its own
+    thread sending the queued frames. A subscriber with `backlog` frames queued, or which can not take a frame
+    within `timeout` seconds, is dropped: the sampler only encodes and queues, it is never stalled.
+    """
+
+    def __init__(self, address: str, info: dict, unit=1, timeout=1., backlog=64):
+        family, addr = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        if family != socket.AF_UNIX:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(addr)
+        self._sock.listen(8)
+        self.address = self._sock.getsockname()
+        self._info = info
+        self._unit = unit
+        self._timeout = timeout
+        self._backlog = backlog
+        self._clients = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, peer = self._sock.accept()
+            except OSError:
+                return
+            conn.settimeout(self._timeout)
+            encoder = FrameEncoder(self._unit)
+            try:
+                conn.sendall(encoder.hello(self._info))
+            except OSError:
+                conn.close()
+                continue
+            logging.debug('Subscriber {} connected'.format(peer))
+            client = (conn, encoder, queue.Queue(self._backlog))
+            with self._lock:
+                self._clients.append(client)
+            threading.Thread(target=self._send, args=(client,), daemon=True).start()
+
+    def _send(self, client):
+        """ Send the queued frames of a subscriber until it is dropped """
+        conn, _, frames = client
+        while True:
+            data = frames.get()
+            if data is None:
+                break
+            try:
+                conn.sendall(data)
+            except OSError:
+                logging.debug('Subscriber dropped')
+                break
+        self._drop(client)
+        conn.close()
+
+    def _drop(self, client):
+        with self._lock:
+            if client not in self._clients:
+                return
+            self._clients.remove(client)
+        conn, _, frames = client
+        try:
+            # wakes up the sender blocked in sendall
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            frames.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def broadcast(self, samples: List[Sample]):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            _, encoder, frames = client
+            try:
+                frames.put_nowait(encoder.encode(samples))
+            except queue.Full:
+                # the deltas of the next frames rely on this one, the stream can not skip it
+                logging.debug('Subscriber dropped, it can not keep up')
+                self._drop(client)
+
+    def close(self):
+        self._sock.close()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            self._drop(client)
+
+
+def positive_int(text: str) -> int:
+    """ Type of the integer options counting at least one item """
+    n = int(text)
+    if n < 1:
+        raise ValueError('{} is less than 1'.format(text))
+    return n
+
+
+def run_agent(names: List[str], interval: float, address: str, batch=1, log=True, metrics='', archive='',
+              min_interval=0., change=1 << 20, context=False, breakdown=-1.):
+    """ Sample processes with given names forever and stream the samples to subscribers
+    :param batch: int
+        Number of ticks buffered before a frame is sent
+    :param log: bool
+        Set to also record samples with python logging, as the GUI does
+    :param metrics: str
+        Address of the Prometheus metrics endpoint, empty to disable
+    :param archive: str
+        Path of the compact sample archive, see `utils.archive`, empty to disable
+    :param min_interval: float
+        Shortest interval of the adaptive sampling, `interval` is the longest one. 0 samples at fixed interval
+    :param change: int
+        Expected change of rss (bytes) between two adaptive samples
+    :param context: bool
+        Set to record the system and cgroup memory context with the samples, see `utils.sampler.MemoryContext`
+    :param breakdown: float
+        Negative to disable, else record the memory by class of mapping with the samples and walk the full
+        smaps every `breakdown` seconds (0: never), see `utils.sampler.SmapsBreakdown`
+    """
+    if batch < 1:
+        raise ValueError('A frame holds at least one tick, got batch {}'.format(batch))
+    unit = os.sysconf('SC_PAGE_SIZE') if sys.platform.startswith('linux') else 1
+    server = SampleServer(address, {'host': socket.gethostname(), 'names': names}, unit)
+    logging.debug('Agent listens on {}'.format(server.address))
+    exporter = MetricsExporter(metrics) if metrics else None
+    writer = ArchiveWriter(archive) if archive else None
+    samplers = [ProcessSampler(name, MemoryContext() if context else None,
+                               SmapsBreakdown(breakdown) if breakdown >= 0 else None) for name in names]
+    adaptive = [AdaptiveInterval(min_interval, interval, change) for _ in names] if 0 < min_interval < interval else []
+    pending = []
+    ticks = 0
+    scheduler = TickScheduler(interval)
+    scheduler.start()
+    try:
+        while True:
+            for i, sampler in enumerate(samplers):
+                for event, pid, ct in sampler.update_process():
+                    logging.debug('Process [{}]-[{}] {}'.format(pid, ct, event))
+                    if event == 'lost':
+                        if exporter is not None:
+                            exporter.discard(pid)
+                        if writer is not None:
+                            # the last samples before e.g. an OOM kill are written at once
+                            writer.flush()
+                    if adaptive:
+                        adaptive[i].reset()
+                s = sampler.sample()
+                if s is not None:
+                    if adaptive:
+                        adaptive[i].update(s.ts, s.rss)
+                    if log:
+                        logging.info(format_record(s))
+                    if exporter is not None:
+                        exporter.update([s])
+                    if writer is not None:
+                        writer.append(s)
+                    pending.append(s)
+            ticks += 1
+            if ticks % batch == 0 and pending:
+                server.broadcast(pending)
+                pending = []
+            # adaptive ticks follow the most active process, processes are looked up at the longest interval
+            steps = [a.interval for a, sampler in zip(adaptive, samplers) if sampler.pid is not None]
+            time.sleep(scheduler.next_delay(min(steps) if steps else interval))
+    finally:
+        server.close()
+        if exporter is not None:
+            exporter.close()
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    # parse opt
+    argtable = argparse.ArgumentParser(
+        description='Memory monitor sampling agent')
+    argtable.add_argument('-p', '--process', dest='process', action='append', required=True,
+                          help='name of the process to sample, can be given several times')
+    argtable.add_argument('-i', '--interval', dest='interval',
+                          help='Sampling time interval in seconds',
+                          type=float, default=1.)
+    argtable.add_argument('--min-interval', dest='min_interval',
+                          help='adaptive sampling: shortest interval in seconds, -i is the longest one, 0 to disable',
+                          type=float, default=0.)
+    argtable.add_argument('--change', dest='change',
+                          help='adaptive sampling: expected change of rss in MB between two samples',
+                          type=float, default=1.)
+    argtable.add_argument('-l', '--listen', dest='listen',
+                          help='listen address, host:port, [ipv6]:port or unix:///path/of/socket',
+                          default='0.0.0.0:9310')
+    argtable.add_argument('-b', '--batch', dest='batch',
+                          help='number of ticks sent in one frame, at least 1',
+                          type=positive_int, default=1)
+    argtable.add_argument('--metrics', dest='metrics',
+                          help='serve Prometheus metrics on given host:port, empty to disable',
+                          default='')
+    argtable.add_argument('--archive', dest='archive',
+                          help='append samples to a compact archive (.mma), empty to disable',
+                          default='')
+    argtable.add_argument('--context', dest='context', action='store_true',
+                          help='record system and cgroup v2 memory context with the samples')
+    argtable.add_argument('--breakdown', dest='breakdown',
+                          help='record anon/file/shmem/swap memory from smaps_rollup and walk the full smaps'
+                               ' every given seconds (0: never), negative to disable',
+                          type=float, default=-1.)
+    argtable.add_argument('--log', dest='log',
+                          help='memory log file, empty to disable',
+                          default='memory.log')
+
+    opt = argtable.parse_args()
+
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    ch = logging.StreamHandler()
+    ch.setFormatter(formatter)
+    ch.setLevel(logging.WARNING)
+    logger.addHandler(ch)
+    if opt.log:
+        fh = logging.FileHandler(opt.log)
+        fh.setFormatter(formatter)
+        fh.setLevel(logging.INFO)
+        logger.addHandler(fh)
+
+    # a kill flushes the archive and closes the sockets as Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        run_agent(opt.process, opt.interval, opt.listen, opt.batch, bool(opt.log), opt.metrics, opt.archive,
+                  opt.min_interval, int(opt.change * 1024 * 1024), opt.context, opt.breakdown)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,502 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 10:48
+#           @file: convert_log.py
+#          @brief: Convert memory monitor logs to columnar files
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 10:48:00
+# *****************************************************
+
+import os
+import re
+import multiprocessing
+import numpy as np
+import pandas as pd
+from typing import Iterator, List
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from parse_log import iter_memory_log, parse_memory_log, to_process_frame, RECORD_COLUMNS
+from parse_log import scan_memory_log, scan_records, merge_scans, TIME_FORMAT
+from utils.archive import ArchiveWriter, read_archive, ARCHIVE_EXTENSION
+from utils.shm import SharedFrame, export_frame, release_all
+
+COLUMNAR_EXTENSIONS = ('.parquet', '.feather', '.npz', ARCHIVE_EXTENSION)
+# columns needed by the viewer, pid is not loaded
+VIEW_COLUMNS = ('timestamp', 'name', 'create_time', 'rss', 'vms')
+# columns needed to scan the processes of a columnar file
+SCAN_COLUMNS = ('timestamp', 'name', 'create_time')
+
+
+def is_columnar(path) -> bool:
+    return os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS
+
+
+def sort_rotated_logs(paths) -> List[str]:
+    """ Sort logs from the oldest to the newest, `memory.log.10` is older than `memory.log.1` and `memory.log` """
+    def rotation(p):
+        m = re.search(r'\.(\d+)$', p)
+        return (os.path.basename(p[:m.start()]) if m else os.path.basename(p)), -(int(m.group(1)) if m else 0)
+    return sorted(paths, key=rotation)
+
+
+def expand_logs(paths, columnar=False) -> List[str]:
+    """ Expand directories to the (rotated) logs inside of them, sorted from the oldest to the newest
+    :param columnar: bool
+        Set to also pick up columnar files in directories
+    """
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for f in os.listdir(p):
+                if re.search(r'\.log(\.\d+)?$', f) or (columnar and is_columnar(f)):
+                    files.append(os.path.join(p, f))
+        else:
+            files.append(p)
+    return sort_rotated_logs(files)
+
+
+def _byte_counter(files, progress):
+    """ Turn the bytes read from every file into (done, total) reports of the set of files """
+    total = sum(os.path.getsize(f) for f in files)
+    done = [0]
+
+    def advance(n):
+        done[0] += n
+        if progress is not None:
+            progress(min(done[0], total), total)
+    return advance
+
+
+def iter_memory_logs(paths, exe_name=None, progress=None) -> Iterator[pd.DataFrame]:
+    """ Stream typed records of a set of (rotated) logs, a directory is expanded to the logs inside of it
+    :param progress: callable or None
+        Called with (bytes read, total bytes) of the logs, it may raise to stop reading
+    """
+    files = expand_logs(paths)
+    advance = _byte_counter(files, progress)
+    for f in files:
+        yield from iter_memory_log(f, exe_name, progress=advance)
+
+
+def _load_one(path, exe_name=None, groups: pd.DataFrame = None, progress=None, partial=None) -> pd.DataFrame:
+    if not is_columnar(path):
+        pairs = None if groups is None else list(zip(groups['name'], groups['create_time']))
+        return parse_memory_log(path, exe_name, pairs, progress, partial)
+    d = load_memory_table(path, exe_name, groups)
+    if progress is not None:
+        progress(os.path.getsize(path))
+    return d
+
+
+def _export_one(path, exe_name=None, groups: pd.DataFrame = None):
+    """ `_load_one` in a worker process, the frame is handed over through shared memory """
+    return export_frame(_load_one(path, exe_name, groups))
+
+
+def _write_one(path, exe_name=None, groups: pd.DataFrame = None, frame: SharedFrame = None, rows: dict = None):
+    """ `_load_one` in a worker process, the records are written in place into the frame of the whole load
+    :param rows: dict
+        path -> (first row, number of rows) of the file in the frame, a file changed since it was scanned is
+        handed over in blocks of its own
+    """
+    d = _load_one(path, exe_name, groups)
+    start, length = rows[path]
+    if len(d) != length:
+        return export_frame(d)
+    return frame.write(d, start)
+
+
+def _scan_one(path, exe_name=None, progress=None) -> pd.DataFrame:
+    if not is_columnar(path):
+        return scan_memory_log(path, exe_name, progress=progress)
+    d = scan_records(read_memory_table(path, exe_name, SCAN_COLUMNS))
+    if progress is not None:
+        progress(os.path.getsize(path))
+    return d
+
+
+def _in_process(files, workers) -> bool:
+    return len(files) <= 1 or workers == 1
+
+
+def _map_files(func, files, workers, args=(), progress=None, partial=None, shared=None, attach=None) -> list:
+    """ Apply func to every file, in parallel worker processes if there are several files
+
+    :param progress: callable or None
+        Called with (bytes done, total bytes), per block of the files handled in this process, per file for
+        worker processes. It may raise (e.g. `utils.jobs.JobCancelled`) to stop: pending files are dropped,
+        worker processes finish their current file in the background.
+    :param partial: callable or None
+        Called with partial results: the result of every file handled by a worker process or of every block
+        of the files handled in this process
+    :param shared: List or None
+        Set if worker processes return `utils.shm.SharedFrame`: they are attached, the results are the frames
+        and the shared frames are appended to the list, the caller owns them
+    :param attach: callable or None
+        Called in place of `SharedFrame.attach` on the shared frames returned by worker processes
+    :return: List
+        Results in the order of files
+    """
+    advance = _byte_counter(files, progress)
+    kwargs = {} if partial is None else {'partial': partial}
+    if _in_process(files, workers):
+        return [func(f, *args, progress=advance, **kwargs) for f in files]
+
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    # workers are spawned, forking the threads of the monitor (sampling, metrics server, ...) may deadlock them
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    futures, handled, attached = {}, set(), []
+    try:
+        futures = {executor.submit(func, f, *args): i for i, f in enumerate(files)}
+        rst = [None] * len(files)
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = futures[future]
+                rst[i] = future.result()
+                if shared is not None:
+                    # attached before the pool is shut down, the worker keeps the blocks until then
+                    attached.append(rst[i])
+                    rst[i] = rst[i].attach() if attach is None else attach(rst[i])
+                handled.add(future)
+                advance(os.path.getsize(files[i]))
+                if partial is not None:
+                    partial(rst[i])
+            # poll for cancellation while the workers are busy
+            advance(0)
+    except BaseException:
+        if shared is not None:
+            release_all(attached)
+            # the other files hand over blocks nobody will attach, they are released once parsed
+            for future in futures:
+                if future not in handled:
+                    future.add_done_callback(_release_future)
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    if shared is not None:
+        shared.extend(attached)
+    return rst
+
+
+def _release_future(future):
+    """ Release the shared frame of a file of an abandoned load """
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        future.result().release()
+    except OSError:
+        pass
+
+
+def scan_memory_logs(paths, exe_name=None, workers=None, progress=None) -> pd.DataFrame:
+    """ Collect the processes of a set of logs and columnar files without parsing the samples of text logs
+    :param progress: callable or None
+        Called with (bytes done, total bytes), see `_map_files`
+    :return: pd.DataFrame
+        See `parse_log.scan_memory_log`
+    """
+    files = expand_logs(paths, columnar=True)
+    scans = _map_files(_scan_one, files, workers, (exe_name or None,), progress)
+    d = merge_scans(scans)
+    # samples of every process in every file, they size the shared memory of a load
+    d.attrs['file_samples'] = {f: scan['samples'] for f, scan in zip(files, scans)}
+    return d
+
+
+def _file_rows(files, labels, scan: pd.DataFrame):
+    """ First row and number of rows of every file in the frame of a load, None if a file was not scanned """
+    samples = {} if scan is None else scan.attrs.get('file_samples', {})
+    if any(f not in samples for f in files):
+        return None
+    rows, start = {}, 0
+    for f in files:
+        n = int(samples[f][samples[f].index.isin(labels)].sum())
+        rows[f] = (start, n)
+        start += n
+    return rows
+
+
+def _load_in_place(files, exe_name, workers, labels, groups, rows, progress, partial, shared) -> pd.DataFrame:
+    """ Load the files in worker processes writing their records in place into one shared frame """
+    frame = SharedFrame.allocate(sum(n for _, n in rows.values()), labels)
+    written = []
+
+    def attach(r: SharedFrame) -> pd.DataFrame:
+        if r.columns['Process'] == frame.columns['Process']:
+            written.append(r)
+            return frame.add_rows(r)
+        # the file changed since it was scanned, its frame is copied out so its blocks are closed at once
+        d = r.attach()
+        rst = d.copy()
+        del d
+        r.release()
+        return rst
+
+    try:
+        frames = _map_files(_write_one, files, workers, (exe_name or None, groups, frame, rows), progress, partial,
+                            [], attach)
+        frame.fill_missing(written)
+    except BaseException:
+        frame.release()
+        raise
+    if len(written) == len(files):
+        del frames
+        shared.append(frame)
+        return frame.attach()
+    d = pd.concat(frames, ignore_index=True)
+    # the views are dropped first so the blocks are unmapped at once
+    del frames
+    frame.release()
+    return d
+
+
+def load_memory_logs(paths, exe_name=None, workers=None, groups: pd.DataFrame = None,
+                     progress=None, partial=None, shared=None, scan: pd.DataFrame = None) -> pd.DataFrame:
+    """ Load a set of logs and columnar files in parallel worker processes
+
+    Records of a process spread over rotated logs are merged in one group since groups are labeled
+    by process name and create time.
+
+    :param paths: List
+        Logs, columnar files or directories of them
+    :param workers: int or None
+        Number of worker processes, None for the number of processors, 1 loads in the calling process
+    :param groups: pd.DataFrame or None
+        Rows of `scan_memory_logs` of the processes to load, all the processes if None
+    :param progress: callable or None
+        Called with (bytes done, total bytes), see `_map_files`
+    :param partial: callable or None
+        Called with the frames loaded so far, piece by piece, see `_map_files`
+    :param shared: List or None
+        Set to keep the frame in the shared memory it was written in by the worker processes (zero-copy),
+        its `utils.shm.SharedFrame` is appended to the list and must be released by the caller.
+        The workers write the records of every file in place when `scan` gives the number of records of
+        the files. Otherwise, or if a file changed since it was scanned, the frames of the files are
+        concatenated into a regular frame (runs may spread over rotated logs), unless a single one is not
+        empty. A load in the calling process (a single file or `workers` 1) uses no shared memory, the list
+        is left empty then
+    :param scan: pd.DataFrame or None
+        Result of `scan_memory_logs` of the same paths and process name
+    :return: pd.DataFrame
+        Columns are `Process`, `Time`, `rss` and `vms`
+    """
+    files = expand_logs(paths, columnar=True)
+    if shared is not None and not _in_process(files, workers):
+        labels = list((scan if groups is None else groups).index) if scan is not None else []
+        rows = _file_rows(files, labels, scan)
+        if rows is not None:
+            return _load_in_place(files, exe_name, workers, labels, groups, rows, progress, partial, shared)
+
+    handoff = [] if shared is None else shared
+    # frames of worker processes are handed over through shared memory instead of being pickled
+    frames = _map_files(_load_one if _in_process(files, workers) else _export_one, files, workers,
+                        (exe_name or None, groups), progress, partial, handoff)
+    frames = [f for f in frames if len(f)]
+    if len(frames) == 1 and shared is not None:
+        # zero-copy: the caller owns the blocks
+        return frames[0]
+    d = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Process', 'Time', 'rss', 'vms'])
+    # the views are dropped first so the blocks are unmapped at once
+    del frames
+    release_all(handoff)
+    return d
+
+
+def _partitions(d: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """ Split records by process and day """
+    day = d['timestamp'].dt.floor('D')
+    d = d.assign(_day=day).sort_values(['name', 'create_time', 'pid', '_day', 'timestamp'], kind='stable')
+    for _, part in d.groupby(['name', 'create_time', 'pid', '_day'], sort=False, dropna=False):
+        yield part.drop(columns='_day')
+
+
+def _arrow_schema(dictionary=True):
+    import pyarrow as pa
+    return pa.schema([
+        ('timestamp', pa.timestamp('ms')),
+        ('pid', pa.uint32()),
+        ('name', pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()),
+        ('create_time', pa.timestamp('s')),
+        ('rss', pa.int64()),
+        ('vms', pa.int64()),
+    ])
+
+
+def convert_memory_log(paths, dst, exe_name=None, compression='zstd', progress=None) -> int:
+    """ Stream memory logs into a compressed columnar file
+
+    The format is selected by the extension of `dst`: Parquet and Feather files require pyarrow,
+    every row group (record batch) holds the records of one process in one day.
+    npz files only require numpy, the names are stored as categorical codes.
+    Archives (`.mma`) store delta encoded varints, see `utils.archive`, records are appended to an existing archive.
+
+    :param paths: List
+        Memory logs or directories of rotated logs
+    :param dst: str
+        Path of the columnar file
+    :param exe_name: str or None
+        Only convert records of the process with given name if set
+    :param compression: str
+        Compression codec of Parquet and Feather files
+    :param progress: callable or None
+        Called with (bytes read, total bytes) of the logs, it may raise to stop converting
+    :return: int
+        Number of converted records
+    """
+    ext = os.path.splitext(dst)[1].lower()
+    if ext not in COLUMNAR_EXTENSIONS:
+        raise ValueError('Unsupported columnar format {}'.format(ext))
+
+    n = 0
+    if ext == '.npz':
+        chunks = list(iter_memory_logs(paths, exe_name, progress))
+        d = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=RECORD_COLUMNS)
+        d = pd.concat(list(_partitions(d)), ignore_index=True) if len(d) else d
+        codes, names = pd.factorize(d['name'])
+        np.savez_compressed(
+            dst,
+            timestamp=d['timestamp'].to_numpy(dtype='datetime64[ms]'),
+            pid=d['pid'].to_numpy(dtype=np.uint32),
+            name=codes.astype(np.int32),
+            name_categories=np.asarray(names, dtype=str),
+            create_time=d['create_time'].to_numpy(dtype='datetime64[s]'),
+            rss=d['rss'].to_numpy(dtype=np.int64),
+            vms=d['vms'].to_numpy(dtype=np.int64),
+        )
+        return len(d)
+
+    if ext == ARCHIVE_EXTENSION:
+        writer = ArchiveWriter(dst)
+        try:
+            for chunk in iter_memory_logs(paths, exe_name, progress):
+                n += writer.write_records(chunk)
+        finally:
+            writer.close()
+        return n
+
+    import pyarrow as pa
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+        schema = _arrow_schema()
+        # slowly changing integers are delta encoded, only names use dictionary
+        writer = pq.ParquetWriter(
+            dst, schema, compression=compression, use_dictionary=['name'],
+            column_encoding={c: 'DELTA_BINARY_PACKED' for c in ('timestamp', 'pid', 'create_time', 'rss', 'vms')})
+    else:
+        # IPC files do not support dictionary replacement between batches
+        schema = _arrow_schema(False)
+        writer = pa.ipc.new_file(dst, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+    try:
+        for chunk in iter_memory_logs(paths, exe_name, progress):
+            for part in _partitions(chunk):
+                writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+                n += len(part)
+    finally:
+        writer.close()
+    return n
+
+
+def _arrow_filter(names, cts):
+    """ Filter expression of the records of given names and create times (None for any) """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    expr = None if names is None else ds.field('name').isin(names)
+    if cts is not None:
+        known = cts.dropna()
+        by_ct = ds.field('create_time').isin(pa.array(known.to_numpy(dtype='datetime64[s]'), pa.timestamp('s')))
+        if len(known) < len(cts):
+            by_ct = by_ct | ds.field('create_time').is_null()
+        expr = by_ct if expr is None else expr & by_ct
+    return expr
+
+
+def _record_mask(name, create_time, names, cts) -> np.ndarray:
+    """ Same as `_arrow_filter` for NumPy columns """
+    mask = np.ones(len(name), dtype=bool)
+    if names is not None:
+        mask &= np.isin(np.asarray(name, dtype=object), np.asarray(names, dtype=object))
+    if cts is not None:
+        create_time = pd.DatetimeIndex(create_time)
+        mask &= create_time.isin(cts.dropna()) | (create_time.isna() if cts.isna().any() else False)
+    return mask
+
+
+def read_memory_table(path, exe_name=None, columns=VIEW_COLUMNS, groups: pd.DataFrame = None) -> pd.DataFrame:
+    """ Read typed records of a columnar file written by `convert_memory_log`
+
+    Only the given columns are read. The name and create time of the records to read (of `exe_name`, of
+    `groups`) are pushed down to pyarrow: row groups of other processes are skipped in Parquet files,
+    record batches of Feather files are filtered as they are read.
+
+    :param columns: Tuple
+        Columns to read, name and create_time are always read
+    :param groups: pd.DataFrame or None
+        Rows of `scan_memory_logs` of the processes to read, all the processes if None. The filter is
+        coarse (names and create times are matched separately), see `load_memory_table`
+    :return: pd.DataFrame
+        Columns in the order of `VIEW_COLUMNS`
+    """
+    columns = [c for c in VIEW_COLUMNS if c in columns or c in ('name', 'create_time')]
+    names = None if not exe_name else [exe_name]
+    cts = None
+    if groups is not None:
+        names = [n for n in groups['name'].unique() if not exe_name or n == exe_name]
+        cts = pd.Series(pd.to_datetime(groups['create_time'], format=TIME_FORMAT, errors='coerce').unique())
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npz':
+        with np.load(path) as z:
+            name = np.asarray(pd.Categorical.from_codes(z['name'], z['name_categories']))
+            mask = _record_mask(name, z['create_time'], names, cts)
+            return pd.DataFrame({c: name[mask] if c == 'name' else z[c][mask] for c in columns}, columns=columns)
+
+    if ext == ARCHIVE_EXTENSION:
+        d = read_archive(path, exe_name)
+        return d.loc[_record_mask(d['name'], d['create_time'], names, cts), columns].reset_index(drop=True)
+
+    if ext not in ('.parquet', '.feather'):
+        raise ValueError('Unsupported columnar format {}'.format(ext))
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format='parquet' if ext == '.parquet' else 'feather')
+    return dataset.to_table(columns=columns, filter=_arrow_filter(names, cts)).to_pandas()
+
+
+def load_memory_table(path, exe_name=None, groups: pd.DataFrame = None) -> pd.DataFrame:
+    """ Load a columnar file written by `convert_memory_log`, see `read_memory_table`
+
+    :param groups: pd.DataFrame or None
+        Rows of `scan_memory_logs` of the processes to load, all the processes if None
+    :return: pd.DataFrame
+        Columns are `Process`, `Time`, `rss` and `vms`
+    """
+    d = to_process_frame(read_memory_table(path, exe_name, VIEW_COLUMNS, groups))
+    return d if groups is None else d[d['Process'].isin(groups.index)].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import time
+    import argparse
+    # parse opt
+    argtable = argparse.ArgumentParser(
+        description='Convert memory monitor logs to Parquet/Feather/npz/archive')
+    argtable.add_argument('logs', nargs='+',
+                          help='memory monitor logs or directories of rotated logs')
+    argtable.add_argument('-o', '--output', dest='output', required=True,
+                          help='the columnar file, format is selected by extension: {}'.format(
+                              ', '.join(COLUMNAR_EXTENSIONS)))
+    argtable.add_argument('-p', '--process', dest='process',
+                          help='only convert records of the process with given name',
+                          default=None)
+    argtable.add_argument('--compression', dest='compression',
+                          help='compression codec of Parquet and Feather files',
+                          default='zstd')
+
+    opt = argtable.parse_args()
+
+    t = time.time()
+    n = convert_memory_log(opt.logs, opt.output, opt.process, opt.compression)
+    print('{} records converted to {} in {:.1f} seconds'.format(n, opt.output, time.time() - t))
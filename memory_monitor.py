@@ -12,11 +12,12 @@
 
 import os
 import sys
-import psutil
+import time
+import socket
+import threading
 import random
 import sqlite3
 import logging
-import datetime
 import collections
 import numpy as np
 import pandas as pd
@@ -27,54 +28,235 @@ from utils.qapp import checkQLineEditValidatorState
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import (
     FigureCanvas, NavigationToolbar2QT as NavigationToolbar)
-from parse_log import parse_memory_log
+from convert_log import load_memory_logs, scan_memory_logs, COLUMNAR_EXTENSIONS
+from utils.compare import align_runs, align_headroom, diff_to_reference, run_summary
+from utils.stats import RunningStats, ThresholdAlert
+from utils.timeaxis import epoch_to_num, setup_time_axis
+from utils.sampler import (ProcessSampler, AdaptiveInterval, TickScheduler, MemoryContext, SmapsBreakdown,
+                           format_record, oom_headroom)
+from utils.sampler import LOG_FORMAT, LOG_DATE_FORMAT
+from utils.wire import FrameDecoder, connect
+from utils.exporter import MetricsExporter
+from utils.archive import ArchiveWriter
+from utils.jobs import JobControl, JobCancelled
+from utils.shm import release_all
 
 __version__ = '1.2.3'
 __revision__ = 14
 __app_tittle__ = 'MemoryUsageMonitor'
 
 
-class MemoryLogParserRunnable(QtCore.QObject):
-    """ Runnable object for parsing memory log  """
+class BackgroundJob(QtCore.QObject):
+    """ Runnable object running a function in the worker thread, it can be cancelled and reports progress
+
+    The function is called with `progress` (and `partial`) keyword arguments, see `utils.jobs.JobControl`,
+    cancellation takes effect at its next report. Events carry the job so the events of a superseded job
+    are ignored.
+    """
     queue = QtCore.Signal()
     ev = QtCore.Signal(object)
 
-    def __init__(self, fpath, p_name=None):
+    def __init__(self, key, func, args=(), label='Working ...', error='Job failed', partial=False, shared=None,
+                 kwargs=None):
+        """
+        :param key: str
+            Key of the event carrying the result, partial results are sent as `<key>_partial`
+        :param error: str
+            Head of the error message
+        :param partial: bool
+            Set to pass partial results to the window
+        :param shared: List or None
+            Filled by the function with the `utils.shm.SharedFrame` backing the result, the window takes them
+            over with the result, they are released if the result is dropped
+        :param kwargs: dict or None
+            Keyword arguments of the function
+        """
         super().__init__()
-        self._fpath = fpath
-        self._p_name = p_name
+        self._key = key
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._label = label
+        self._error = error
+        self._partial = partial
+        self.shared = [] if shared is None else shared
+        self.control = JobControl(self._on_progress, self._on_partial)
         self.queue.connect(self.run)
 
+    def cancel(self):
+        """ Cancel the job, thread safe """
+        self.control.cancel()
+
+    def _emit(self, d):
+        d['job'] = self
+        self.ev.emit(d)
+
+    def _on_progress(self, done, total):
+        self._emit({'progress_update': int(1000 * done / total) if total else 1000,
+                    'progress_text': '{} {:.1f} / {:.1f} MB'.format(self._label, done / 1048576, total / 1048576)})
+
+    def _on_partial(self, result):
+        self._emit({'{}_partial'.format(self._key): result})
+
     @QtCore.Slot()
     def run(self):
-        self.ev.emit({'progress_init': ('Parsing ...', 200, 0, 0)})
+        # superseded before it was started
+        if self.control.cancelled:
+            return
+        self._emit({'progress_init': (self._label, 200, 0, 1000)})
+        kwargs = dict(self._kwargs, progress=self.control.progress)
+        if self._partial:
+            kwargs['partial'] = self.control.partial
         try:
-            d = parse_memory_log(self._fpath, self._p_name)
-            self.ev.emit({'progress_reset': 1})
-            self.ev.emit({'memory_log': d})
+            rst = self._func(*self._args, **kwargs)
+            self.control.check()
+            self._emit({'progress_reset': 1})
+            self._emit({self._key: rst})
+        except JobCancelled:
+            release_all(self.shared)
+            self._emit({'progress_reset': 1})
+            self._emit({'job_cancelled': self._label})
         except Exception as e:
-            error_msg = 'Failed to parse memory log {}. Error message is {}'.format(self._fpath, repr(e))
+            error_msg = '{}. Error message is {}'.format(self._error, repr(e))
             logging.error(error_msg)
-            self.ev.emit({'progress_reset': 1})
-            self.ev.emit({'error': error_msg})
+            self._emit({'progress_reset': 1})
+            self._emit({'error': error_msg})
+
+
+class ProcessSamplingRunnable(QtCore.QObject):
+    """ Runnable object sampling the monitored process on a drift free schedule
+
+    Sampling runs out of the GUI thread so ticks are neither delayed nor dropped by redraws of the chart.
+    Samples are logged, exported and archived here, the GUI only buffers and draws them.
+    """
+    queue = QtCore.Signal()
+    ev = QtCore.Signal(object)
+
+    def __init__(self, sampler: ProcessSampler, interval: float, adaptive=None, archive=None, exporter=None):
+        super().__init__()
+        self._sampler = sampler
+        self._adaptive = adaptive  # type: Union[None, AdaptiveInterval]
+        self._archive = archive  # type: Union[None, ArchiveWriter]
+        self._exporter = exporter  # type: Union[None, MetricsExporter]
+        self.scheduler = TickScheduler(adaptive.interval if adaptive is not None else interval)
+        self._stopped = threading.Event()
+        self.queue.connect(self.run)
+
+    @QtCore.Slot()
+    def run(self):
+        try:
+            delay = self.scheduler.start()
+            while not self._stopped.wait(delay):
+                self._tick()
+                delay = self.scheduler.next_delay()
+        except Exception as e:
+            error_msg = 'Sampling of {} failed. Error message is {}'.format(self._sampler.name, repr(e))
+            logging.error(error_msg)
+            self.ev.emit({'status': error_msg})
+
+    def _tick(self):
+        for event, pid, ct in self._sampler.update_process():
+            if event == 'lost':
+                if self._exporter is not None:
+                    self._exporter.discard(pid)
+                if self._archive is not None:
+                    # the last samples before e.g. an OOM kill are written at once
+                    self._archive.flush()
+                if self._adaptive is not None:
+                    # look for a new process at the longest interval, then sample it fast again
+                    self._adaptive.reset()
+                    self.scheduler.interval = self._adaptive.max_interval
+            self.ev.emit({'process': (event, pid, ct)})
+        sample = self._sampler.sample()
+        if sample is not None:
+            logging.info(format_record(sample))
+            if self._exporter is not None:
+                self._exporter.update([sample])
+            if self._archive is not None:
+                self._archive.append(sample)
+            if self._adaptive is not None:
+                self.scheduler.interval = self._adaptive.update(sample.ts, sample.rss)
+            self.ev.emit({'sample': sample})
+
+    def stop(self):
+        self._stopped.set()
+
+
+class AgentSubscriber(QtCore.QObject):
+    """ Runnable object receiving samples streamed by a sampling agent """
+    queue = QtCore.Signal()
+    ev = QtCore.Signal(object)
+
+    def __init__(self, address):
+        super().__init__()
+        self._address = address
+        self._sock = None  # type: Union[None, socket.socket]
+        self._running = True
+        self.queue.connect(self.run)
+
+    @QtCore.Slot()
+    def run(self):
+        try:
+            self._sock = connect(self._address)
+            # a stop may come during the connection, the socket is not shut down then
+            if not self._running:
+                self._sock.close()
+                return
+            # `_running` is checked at least every second, even if the agent stays silent
+            self._sock.settimeout(1.)
+            decoder = FrameDecoder()
+            while self._running:
+                try:
+                    data = self._sock.recv(1 << 16)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                samples = decoder.feed(data)
+                if samples:
+                    self.ev.emit({'remote_samples': (self._address, decoder.info.get('host', self._address),
+                                                     samples)})
+            msg = 'Agent {} disconnected'.format(self._address)
+        except Exception as e:
+            msg = 'Agent {} failed. Error message is {}'.format(self._address, repr(e))
+        if self._sock is not None:
+            self._sock.close()
+        if self._running:
+            logging.warning(msg)
+            self.ev.emit({'status': msg})
+
+    def stop(self):
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
 
 
 class TreeItemsSelector(QtWidgets.QDialog):
-    """ A common item selector using tree widget """
+    """ A common item selector using tree widget, items may come with detail columns """
 
-    def __init__(self, items: list, title='Items Selector', item_cat='Features', parent=None):
+    def __init__(self, items: list, title='Items Selector', item_cat='Features', parent=None,
+                 details: dict = None, detail_labels=()):
+        """
+        :param details: dict or None
+            item -> texts of the detail columns
+        :param detail_labels: List
+            Headers of the detail columns
+        """
         super().__init__(parent)
         self.setWindowTitle(title)
-        self.setMinimumSize(400, 200)
+        self.setMinimumSize(400 + 120 * len(detail_labels), 200)
         self._items = {}
-        self._init_ui(items, item_cat)
+        self._init_ui(items, item_cat, details or {}, list(detail_labels))
 
-    def _init_ui(self, items, item_cat):
+    def _init_ui(self, items, item_cat, details, detail_labels):
         """ Initialize the user interface """
         tree = QtWidgets.QTreeWidget()
-        tree.setColumnCount(1)
+        tree.setColumnCount(1 + len(detail_labels))
         # tree.setHeaderHidden(True)
-        tree.setHeaderLabel(item_cat)
+        tree.setHeaderLabels([item_cat] + detail_labels)
 
         # parent = QtWidgets.QTreeWidgetItem(tree)
         # parent.setText(0, '{}'.format(item_cat))
@@ -84,6 +266,10 @@ class TreeItemsSelector(QtWidgets.QDialog):
             tree_item.setText(0, '{}'.format(item))
             tree_item.setFlags(tree_item.flags() | QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsSelectable)
             tree_item.setCheckState(0, QtCore.Qt.Unchecked)
+            for col, txt in enumerate(details.get(item, ()), 1):
+                tree_item.setText(col, txt)
+        for col in range(tree.columnCount()):
+            tree.resizeColumnToContents(col)
 
         tree.itemChanged.connect(self._on_item_toggled)
 
@@ -112,6 +298,27 @@ class TreeItemsSelector(QtWidgets.QDialog):
         return tuple(items)
 
 
+class RunSummaryDialog(QtWidgets.QDialog):
+    """ Table of the summary statistics of loaded runs """
+
+    def __init__(self, summary: pd.DataFrame, title='Run Summary', parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumSize(800, 200)
+        table = QtWidgets.QTableWidget(len(summary), len(summary.columns) + 1)
+        table.setHorizontalHeaderLabels(['process'] + list(summary.columns))
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        for row, (key, values) in enumerate(summary.iterrows()):
+            table.setItem(row, 0, QtWidgets.QTableWidgetItem(key))
+            for col, v in enumerate(values, 1):
+                txt = '{:.2f}'.format(v) if isinstance(v, float) else '{}'.format(v)
+                table.setItem(row, col, QtWidgets.QTableWidgetItem(txt))
+        table.resizeColumnsToContents()
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(table)
+        self.setLayout(layout)
+
+
 class MemoryUsageMonitor(QtWidgets.QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -120,18 +327,55 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
                                           'HF_AIO', 'MemoryUsageMonitor')
         self._pid = None
         self._ct = ''
+        self._sampling = None  # type: Union[None, Tuple[QtCore.QThread, ProcessSamplingRunnable]]
         self._dq = collections.deque(maxlen=self._settings.value('dq_maxlen', 120, type=int))
+        # buffers and lines of series streamed by agents, (agent, pid, name, create time) -> [deque, line, label]
+        self._remote = {}
+        self._subscribers = []
+        # subscribers stopped but still running, kept until their threads end
+        self._stopping = []
+        self._live_chart = False
+        # selected groups of the loaded logs, drawn as overlay aligned by process start or as diff to the first run
+        self._log_frame = None  # type: Union[None, pd.DataFrame]
+        self._log_paths = []
+        self._compare_diff = False
+        self._exporter = None  # type: Union[None, MetricsExporter]
+        metrics = self._settings.value('metrics_address', '', type=str)
+        if metrics:
+            try:
+                self._exporter = MetricsExporter(metrics)
+            except Exception as e:
+                logging.error('Failed to serve metrics on {}. Error message is {}'.format(metrics, repr(e)))
+        # compact archive of the samples next to the text log, enabled by the `archive_path` setting
+        self._archive = None  # type: Union[None, ArchiveWriter]
+        # running statistics of every monitored process, they survive the roll off of the buffer
+        self._stats = {}
+        self._alert = ThresholdAlert()
         self._progress = QtWidgets.QProgressDialog(self)
-        self._progress.setCancelButton(None)
+        self._progress.canceled.connect(self._cancel_job)
         self._progress.setWindowTitle(__app_tittle__)
         self._progress.setWindowModality(QtCore.Qt.WindowModal)
         self._progress.setMinimumWidth(300)
         self._progress.reset()
         self._worker_thread = QtCore.QThread()
         self._worker_thread.start()
-        self._log_parse_runnable = None  # type: Union[None, QtCore.QObject]
-        self._timer = QtCore.QTimer()
-        self._timer.timeout.connect(self._on_timer)
+        # the latest background job, events of former jobs are ignored
+        self._job = None  # type: Union[None, BackgroundJob]
+        # partial frames of the log being loaded, drawn every `_partial_gap` seconds
+        self._log_parts = []
+        # shared memory backing the loaded runs, see `utils.shm`
+        self._log_shared = []
+        self._partial_drawn = 0.
+        self._partial_gap = 1.
+        # the live chart is redrawn at most every `_refresh_gap` seconds, the gap follows the cost of a redraw
+        self._last_refresh = 0.
+        self._refresh_gap = 0.1
+        self._redraw_requested = None
+        # band of the OOM headroom of the monitored process, drawn when memory context is recorded
+        self._headroom_band = None
+        self._headroom_legend = False
+        self._breakdown_stack = []
+        self._breakdown_legend = False
         self._init_ui()
         self._setup_shortcuts()
 
@@ -157,6 +401,8 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         main_layout.addLayout(ctrl_layout)
         widget.setLayout(main_layout)
         self.setCentralWidget(widget)
+        self._stats_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self._stats_label)
         self.statusBar().showMessage('Launched ...', 1000)
 
     def _setup_plot_frame(self, monitor=True):
@@ -190,6 +436,7 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         canvas = FigureCanvas(Figure(figsize=(5, 3)))
         self._mpl_ax = canvas.figure.subplots()
         canvas.figure.set_tight_layout(True)
+        canvas.mpl_connect('draw_event', self._on_chart_drawn)
         self.addToolBar(
             QtCore.Qt.TopToolBarArea,
             NavigationToolbar(self._mpl_ax.figure.canvas, self)
@@ -202,16 +449,44 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
 
         label1 = QtWidgets.QLabel('Interval (second)')
         interval = QtWidgets.QLineEdit()
-        interval.setValidator(QtGui.QIntValidator(0, 1000000000))
+        validator = QtGui.QDoubleValidator(0.01, 1000000000, 3)
+        validator.setLocale(QtCore.QLocale.c())
+        validator.setNotation(QtGui.QDoubleValidator.StandardNotation)
+        interval.setValidator(validator)
         interval.setObjectName('interval')
         interval.setAlignment(QtCore.Qt.AlignCenter)
-        interval.setToolTip('Data sampling interval')
+        interval.setToolTip('Data sampling interval, fractions of second down to 0.01 are supported')
         interval.setText(self._settings.value('interval', '10', type=str))
         interval.textEdited[str].connect(self._update_settings)
         interval.textChanged.connect(self._check_validator_state)
         layout.addWidget(label1)
         layout.addWidget(interval)
 
+        adaptive = QtWidgets.QCheckBox('Adaptive')
+        adaptive.setObjectName('adaptive_interval')
+        adaptive.setToolTip('Sample faster (down to the `min_interval` setting) when memory usage changes fast,'
+                            ' the interval above is the longest one')
+        adaptive.setChecked(self._settings.value('adaptive_interval', 0, type=int) == 1)
+        adaptive.stateChanged.connect(self._update_settings)
+        layout.addWidget(adaptive)
+
+        context = QtWidgets.QCheckBox('Context')
+        context.setObjectName('memory_context')
+        context.setToolTip('Also record system memory, swap and the memory of the cgroup (v2) of the process,'
+                           ' the headroom before OOM is drawn as a band above the usage')
+        context.setChecked(self._settings.value('memory_context', 0, type=int) == 1)
+        context.stateChanged.connect(self._update_settings)
+        layout.addWidget(context)
+
+        breakdown = QtWidgets.QCheckBox('Breakdown')
+        breakdown.setObjectName('memory_breakdown')
+        breakdown.setToolTip('Also record anonymous, file backed, shared and swapped memory of the process'
+                             ' (Linux smaps_rollup), drawn stacked under the usage. The full smaps is walked'
+                             ' every `smaps_interval` seconds (0: never)')
+        breakdown.setChecked(self._settings.value('memory_breakdown', 0, type=int) == 1)
+        breakdown.stateChanged.connect(self._update_settings)
+        layout.addWidget(breakdown)
+
         label2 = QtWidgets.QLabel('Process name')
         p_name = QtWidgets.QLineEdit()
         p_name.setObjectName('process_name')
@@ -254,12 +529,24 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         shortcut_s.activated.connect(self._toggle_start_stop)
         shortcut_o = QtWidgets.QShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL + QtCore.Qt.Key_O), self)
         shortcut_o.activated.connect(self._open_memory_log)
+        shortcut_shift_o = QtWidgets.QShortcut(
+            QtGui.QKeySequence(QtCore.Qt.CTRL + QtCore.Qt.SHIFT + QtCore.Qt.Key_O), self)
+        shortcut_shift_o.activated.connect(self._open_memory_log_dir)
+        shortcut_m = QtWidgets.QShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL + QtCore.Qt.Key_M), self)
+        shortcut_m.activated.connect(self._toggle_compare_mode)
+        shortcut_i = QtWidgets.QShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL + QtCore.Qt.Key_I), self)
+        shortcut_i.activated.connect(self._show_run_summary)
+        shortcut_r = QtWidgets.QShortcut(QtGui.QKeySequence(QtCore.Qt.CTRL + QtCore.Qt.Key_R), self)
+        shortcut_r.activated.connect(self._subscribe_agents)
 
     def _on_buffer_size_changed(self):
         try:
             val = self._settings.value('dq_maxlen', 120, type=int)
             self._dq = collections.deque(reversed(self._dq), maxlen=val)
             self._dq.reverse()
+            for series in self._remote.values():
+                series[0] = collections.deque(reversed(series[0]), maxlen=val)
+                series[0].reverse()
             msg = 'New buffer max length is {}, current size is {}'.format(val, len(self._dq))
             self.statusBar().showMessage(msg, 1000)
         except Exception as e:
@@ -275,7 +562,7 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         self.statusBar().showMessage(msg, 1000)
 
     def _toggle_start_stop(self):
-        if self._timer.isActive():
+        if self._sampling is not None:
             self._on_stop()
         else:
             self._on_start()
@@ -283,18 +570,69 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
     def _on_start(self):
         self._stop_btn.setEnabled(True)
         self._start_btn.setEnabled(False)
-        interval = self._settings.value('interval', 10, type=int)
+        interval = max(self._settings.value('interval', 10, type=float), 0.01)
         p_name = self._settings.value('process_name', '', type=str)
         msg = 'Start monitor: [interval: {}, process name {}]'.format(interval, p_name)
         logging.debug(msg)
         self.statusBar().showMessage(msg, 1000)
-        # start timer
+        # start sampling
+        self._release_log_frame()
         self._dq.clear()
         self._pid = None
         self._ct = ''
-        self._timer.start(interval * 1000)
+        self._stats.clear()
+        self._stats_label.clear()
+        self._alert = ThresholdAlert(
+            rss_limit=self._settings.value('alert_rss', 0, type=float),
+            growth_limit=self._settings.value('alert_growth', 0, type=float),
+            command=self._settings.value('alert_command', '', type=str)
+        )
+        adaptive = None
+        if self._settings.value('adaptive_interval', 0, type=int) == 1:
+            adaptive = AdaptiveInterval(
+                min_interval=self._settings.value('min_interval', 0.5, type=float),
+                max_interval=interval,
+                change=self._settings.value('adaptive_change', 1, type=float) * 1024 * 1024,
+                limit=self._settings.value('alert_rss', 0, type=float) * 1024 * 1024
+            )
+        archive = self._settings.value('archive_path', '', type=str)
+        if archive and self._archive is None:
+            try:
+                self._archive = ArchiveWriter(archive)
+            except OSError as e:
+                logging.error('Failed to open archive {}. Error message is {}'.format(archive, repr(e)))
+        self._last_refresh = 0.
+        self._reset_live_chart()
+        thread = QtCore.QThread()
+        context = MemoryContext() if self._settings.value('memory_context', 0, type=int) == 1 else None
+        breakdown = None
+        if self._settings.value('memory_breakdown', 0, type=int) == 1:
+            breakdown = SmapsBreakdown(self._settings.value('smaps_interval', 60., type=float))
+        runnable = ProcessSamplingRunnable(ProcessSampler(p_name, context, breakdown), interval, adaptive,
+                                           self._archive, self._exporter)
+        runnable.moveToThread(thread)
+        runnable.ev.connect(self._on_assist_worker_thread_event)
+        thread.start()
+        runnable.queue.emit()
+        self._sampling = (thread, runnable)
+
+    def _reset_live_chart(self):
         self._mpl_ax.clear()
         self._setup_plot_frame()
+        # drop the placeholder curves, samples are drawn against their epoch timestamps
+        self.line_rss.set_data([], [])
+        self.line_vms.set_data([], [])
+        self._mpl_ax.relim()
+        # limits are only set by `_refresh_live_chart`, bands and stacks must not autoscale them
+        self._mpl_ax.set_autoscale_on(False)
+        self._headroom_band = None
+        self._headroom_legend = False
+        self._breakdown_stack = []
+        self._breakdown_legend = False
+        setup_time_axis(self._mpl_ax.xaxis)
+        for series in self._remote.values():
+            series[1] = None
+        self._live_chart = True
 
     def _on_stop(self):
         self._stop_btn.setEnabled(False)
@@ -302,8 +640,20 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         msg = 'Stop monitor: [pid: {}, create time: {}]'.format(self._pid, self._ct)
         logging.debug(msg)
         self.statusBar().showMessage(msg, 1000)
-        # stop timer
-        self._timer.stop()
+        # stop sampling, the archive is closed once the sampling thread is done with it
+        if self._sampling is not None:
+            thread, runnable = self._sampling
+            runnable.ev.disconnect(self._on_assist_worker_thread_event)
+            runnable.stop()
+            thread.quit()
+            thread.wait()
+            self._sampling = None
+        self._close_archive()
+
+    def _close_archive(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
 
     def _update_settings(self, q_str):
         w = self.sender()
@@ -322,82 +672,218 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         checkQLineEditValidatorState(self.sender(), self.palette().color(QtGui.QPalette.Base))
 
     def closeEvent(self, event):
+        self._cancel_job()
+        self._release_log_frame()
+        self._unsubscribe_agents(wait=True)
+        if self._sampling is not None:
+            self._on_stop()
+        self._close_archive()
+        if self._exporter is not None:
+            self._exporter.close()
+            self._exporter = None
         super().closeEvent(event)
 
-    def _update_process_id(self, p_name):
-        # try to check whether this id is still valid
-        if self._pid is not None:
-            try:
-                p = psutil.Process(self._pid)
-                if p.name() != p_name:
-                    self._pid = None
-                    self._ct = ''
-            except Exception:
-                msg = 'Process [{}]-[{}] is Dead'.format(self._pid, self._ct)
-                logging.info(msg)
-                self.statusBar().showMessage(msg, 1000)
-                self._pid, self._ct = None, ''
-                self._dq.clear()
-                self._mpl_ax.set_title(
-                    'Memory Usage Monitor ({} Not Found)'.format(p_name),
-                    color='w', fontdict={'fontsize': 10})
-                self._mpl_ax.figure.canvas.draw_idle()
-
-        # try to get a new pid
-        if self._pid is None:
-            for proc in psutil.process_iter(attrs=['pid', 'name']):
-                if proc.info['name'] == p_name:
-                    self._pid = proc.info['pid']
-                    self._ct = datetime.datetime.fromtimestamp(
-                        proc.create_time()).strftime('%Y-%m-%d %H:%M:%S')
-                    self._mpl_ax.set_title('Memory Usage Monitor ({} - {})'.format(p_name, self._ct),
-                                           color='w', fontdict={'fontsize': 10})
-                    msg = 'New process [{}]-[{}] found'.format(self._pid, self._ct)
-                    logging.info(msg)
-                    self.statusBar().showMessage(msg, 1000)
-                    break
+    def _subscribe_agents(self):
+        agents, ok = QtWidgets.QInputDialog.getText(
+            self, __app_tittle__, 'Agents to subscribe (comma separated host:port or unix:///path):',
+            text=self._settings.value('agents', '', type=str))
+        if not ok:
+            return
+        self._settings.setValue('agents', agents)
+        self._unsubscribe_agents()
+        addresses = [a.strip() for a in agents.split(',') if a.strip()]
+        if not addresses:
+            return
+        if not self._live_chart:
+            self._reset_live_chart()
+        for address in addresses:
+            thread = QtCore.QThread()
+            subscriber = AgentSubscriber(address)
+            subscriber.moveToThread(thread)
+            subscriber.ev.connect(self._on_assist_worker_thread_event)
+            thread.start()
+            subscriber.queue.emit()
+            self._subscribers.append((thread, subscriber))
+        self.statusBar().showMessage('Subscribed to {} agent(s)'.format(len(addresses)), 1000)
+
+    def _unsubscribe_agents(self, wait=False):
+        """ Stop the subscribers, their threads end in the background within the connection timeout
+        :param wait: bool
+            Set to wait for the threads to end, e.g. when the window is closed
+        """
+        for thread, subscriber in self._subscribers:
+            subscriber.ev.disconnect(self._on_assist_worker_thread_event)
+            subscriber.stop()
+            # a running thread must not be destroyed, it is kept until it ends
+            thread.finished.connect(self._on_subscriber_finished)
+            thread.quit()
+            self._stopping.append((thread, subscriber))
+        self._subscribers = []
+        self._remote.clear()
+        if wait:
+            for thread, _ in self._stopping:
+                thread.wait()
+            self._stopping = []
 
-    def _on_timer(self):
+    def _on_subscriber_finished(self):
+        thread = self.sender()
+        self._stopping = [(t, s) for t, s in self._stopping if t is not thread]
+
+    def _on_remote_samples(self, address, host, samples):
+        maxlen = self._dq.maxlen
+        for sample in samples:
+            key = (address, sample.pid, sample.name, sample.create_time)
+            series = self._remote.get(key)
+            if series is None:
+                series = [collections.deque(maxlen=maxlen), None, '{}: {} ({})'.format(host, sample.name, sample.pid)]
+                self._remote[key] = series
+            series[0].appendleft((sample.ts, sample.rss, sample.vms))
+            self._update_stats(key, series[2], sample.ts, sample.rss / 1024 / 1024)
+        if self._exporter is not None:
+            self._exporter.update(samples, address)
+        self._refresh_live_chart()
+
+    def _on_process_event(self, event, pid, ct):
         p_name = self._settings.value('process_name', '', type=str)
-        self._update_process_id(p_name)
-        if self._pid is not None:
-            process = psutil.Process(self._pid)
-            memory_usage = process.memory_info()
-            logging.info('[{}]-[{}]-[{}] - [{}, {}]'.format(
-                self._pid, p_name, self._ct, memory_usage.rss, memory_usage.vms))
-            ts = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            self._dq.appendleft((ts, memory_usage.rss, memory_usage.vms))
-            x = np.arange(0, len(self._dq))
-
-            self.line_rss.set_xdata(x)
-            rss = np.array([x[1] / 1024 / 1024 for x in self._dq])
-            self.line_rss.set_ydata(rss)
-
-            self.line_vms.set_xdata(x)
-            vms = np.array([x[2] / 1024 / 1024 for x in self._dq])
-            self.line_vms.set_ydata(vms)
-
-            self._mpl_ax.set_ylim(0, max(np.max(vms), np.max(rss)) * 1.1)
-            self._mpl_ax.set_xlim(
-                0,
-                min(max(len(x) * 1.2, self._dq.maxlen // 4), self._dq.maxlen)
-            )
+        if event == 'lost':
+            msg = 'Process [{}]-[{}] is Dead'.format(pid, ct)
+            logging.info(msg)
+            self.statusBar().showMessage(msg, 1000)
+            self._dq.clear()
+            self._pid, self._ct = None, ''
+            self._mpl_ax.set_title(
+                'Memory Usage Monitor ({} Not Found)'.format(p_name),
+                color='w', fontdict={'fontsize': 10})
+            self._mpl_ax.figure.canvas.draw_idle()
+        else:
+            self._mpl_ax.set_title('Memory Usage Monitor ({} - {})'.format(p_name, ct),
+                                   color='w', fontdict={'fontsize': 10})
+            msg = 'New process [{}]-[{}] found'.format(pid, ct)
+            logging.info(msg)
+            self.statusBar().showMessage(msg, 1000)
+            self._pid, self._ct = pid, ct
 
-            ts = [x[0] for x in self._dq]
-            labels = []
-            for pos in self._mpl_ax.get_xticks():
-                pos = int(pos)
-                if pos < len(ts):
-                    labels.append(ts[pos][5:])
-                else:
-                    labels.append('')
-            self._mpl_ax.set_xticklabels(labels)
+    def _on_sample(self, sample):
+        extra = sample.extra
+        headroom = float(oom_headroom(extra.get('sys_available', np.nan), extra.get('cg_current', np.nan),
+                                      extra.get('cg_max', np.nan)))
+        self._dq.appendleft((sample.ts, sample.rss, sample.vms, headroom) +
+                            tuple(extra.get(k, np.nan) for k in SmapsBreakdown.BREAKDOWN_KEYS))
+        self._update_stats((self._pid, self._ct), '{} ({})'.format(sample.name, self._pid), sample.ts,
+                           sample.rss / 1024 / 1024)
+        if 'sys_available' in extra:
+            self._stats_label.setText('{}, Headroom: {:.0f} MB, Swap: {:.0f} MB'.format(
+                self._stats_label.text(), headroom / 1024 / 1024, extra.get('swap_used', 0) / 1024 / 1024))
+        # fast sampling must not be throttled by the redraws of the chart
+        now = time.monotonic()
+        if now - self._last_refresh >= self._refresh_gap:
+            self._last_refresh = now
+            self._refresh_live_chart()
 
-            self._mpl_ax.figure.canvas.draw()
+    def _on_chart_drawn(self, event):
+        if self._redraw_requested is not None:
+            # redraws take at most about 20% of the time, and happen at least every 2 seconds
+            cost = time.monotonic() - self._redraw_requested
+            self._refresh_gap = min(max(0.1, cost * 4), 2.)
+            self._redraw_requested = None
+
+    def _refresh_live_chart(self):
+        lines = []
+        stack_top = 0.
+        if self._dq:
+            data = np.array(self._dq, dtype=np.float64)
+            x = epoch_to_num(data[:, 0])
+            self.line_rss.set_data(x, data[:, 1] / 1024 / 1024)
+            self.line_vms.set_data(x, data[:, 2] / 1024 / 1024)
+            lines.extend([self.line_rss, self.line_vms])
+            self._draw_headroom(x, data[:, 1] / 1024 / 1024, data[:, 3] / 1024 / 1024)
+            self._draw_breakdown(x, data[:, 4:] / 1024 / 1024)
+            if self._breakdown_stack:
+                # swapped out memory may stack above rss
+                stack_top = np.nanmax(np.nansum(data[:, 4:], axis=1)) / 1024 / 1024
+        new_line = False
+        for series in self._remote.values():
+            if series[1] is None:
+                series[1] = self._mpl_ax.plot([], [], '-', label=series[2])[0]
+                new_line = True
+            data = np.array(series[0], dtype=np.float64)
+            series[1].set_data(epoch_to_num(data[:, 0]), data[:, 1] / 1024 / 1024)
+            lines.append(series[1])
+        if new_line:
+            self._mpl_ax.legend()
+        if not lines:
+            return
+
+        # limits are only changed when samples leave the view, so ticks and labels are reused
+        x_new = max(line.get_xdata()[0] for line in lines)
+        x_old = min(line.get_xdata()[-1] for line in lines)
+        y_max = max(stack_top, max(np.max(line.get_ydata()) for line in lines))
+        _, top = self._mpl_ax.get_ylim()
+        if y_max > top or y_max * 1.5 < top:
+            self._mpl_ax.set_ylim(0, y_max * 1.2)
+        left, right = self._mpl_ax.get_xlim()
+        if x_old < left or x_new > right:
+            span = self._settings.value('interval', 10, type=float) * self._dq.maxlen / 86400
+            width = min(max((x_new - x_old) * 1.25, span / 4), span * 1.25)
+            self._mpl_ax.set_xlim(x_old, x_old + max(width, 1 / 86400))
+
+        self._redraw_requested = time.monotonic()
+        self._mpl_ax.figure.canvas.draw_idle()
+
+    def _draw_headroom(self, x, rss, headroom):
+        """ Band between the usage and the level where the process runs out of memory, samples without
+        memory context are left out
+        """
+        if self._headroom_band is not None:
+            self._headroom_band.remove()
+            self._headroom_band = None
+        known = ~np.isnan(headroom)
+        if not known.any():
+            return
+        self._headroom_band = self._mpl_ax.fill_between(
+            x, rss, rss + np.where(known, headroom, 0), where=known, color=self.line_rss.get_color(),
+            alpha=0.15, linewidth=0, label='OOM Headroom')
+        if not self._headroom_legend:
+            self._headroom_legend = True
+            self._mpl_ax.legend()
+
+    def _draw_breakdown(self, x, parts):
+        """ Stacked areas of the memory of the process by class of mapping (`SmapsBreakdown.BREAKDOWN_KEYS`),
+        samples without breakdown are left out
+        """
+        for artist in self._breakdown_stack:
+            artist.remove()
+        self._breakdown_stack = []
+        known = ~np.isnan(parts[:, 0])
+        if not known.any():
+            return
+        labels = [k[3:].capitalize() for k in SmapsBreakdown.BREAKDOWN_KEYS]
+        self._breakdown_stack = self._mpl_ax.stackplot(
+            x[known], np.nan_to_num(parts[known]).T, labels=labels, alpha=0.35, linewidth=0, zorder=1)
+        if not self._breakdown_legend:
+            self._breakdown_legend = True
+            self._mpl_ax.legend()
+
+    def _update_stats(self, key, name, ts, rss):
+        if key not in self._stats:
+            self._stats[key] = RunningStats()
+        stats = self._stats[key]
+        stats.add(ts, rss)
+        self._stats_label.setText(
+            '{} RSS min/mean/max: {:.1f}/{:.1f}/{:.1f} MB, P95: {:.1f} MB, Trend: {:+.2f} MB/h'.format(
+                name, stats.min, stats.mean, stats.max, stats.quantiles[0.95], stats.slope))
+        alerts = self._alert.check(name, stats, rss)
+        if alerts:
+            self.statusBar().showMessage('; '.join(alerts), 10000)
 
     @QtCore.Slot(object)
     def _on_assist_worker_thread_event(self, d):
         """ d is python dict """
+        job = d.get('job')
+        if job is not None and job is not self._job:
+            # the result of a superseded job is dropped
+            release_all(job.shared)
+            return
         if 'error' in d:
             error_msg = d['error']
             QtWidgets.QMessageBox.critical(self, __app_tittle__, error_msg)
@@ -411,23 +897,47 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
             self._progress.setRange(pos_min, pos_max)
             self._progress.setValue(pos_min)
         elif 'progress_update' in d:
+            if 'progress_text' in d:
+                self._progress.setLabelText(d['progress_text'])
             self._progress.setValue(d['progress_update'])
         elif 'progress_reset' in d:
             self._progress.reset()
+        elif 'memory_log_keys' in d:
+            self._select_memory_log_groups(d['memory_log_keys'])
+        elif 'memory_log_partial' in d:
+            self._on_memory_log_partial(d['memory_log_partial'])
         elif 'memory_log' in d:
-            self._draw_memory_log(d['memory_log'])
+            self._draw_memory_log(d['memory_log'], job.shared)
+        elif 'job_cancelled' in d:
+            self._on_job_cancelled(d['job_cancelled'])
+        elif 'sample' in d:
+            self._on_sample(d['sample'])
+        elif 'process' in d:
+            self._on_process_event(*d['process'])
+        elif 'remote_samples' in d:
+            self._on_remote_samples(*d['remote_samples'])
+        elif 'status' in d:
+            self.statusBar().showMessage(d['status'], 5000)
 
-    def _draw_memory_log(self, d: pd.DataFrame):
-        if d.empty:
+    def _select_memory_log_groups(self, scan: pd.DataFrame):
+        """ Select the groups to draw from the scan of the logs, then parse the samples of the selected groups """
+        if scan.empty:
             p_name = self._settings.value('process_name', '', type=str)
             QtWidgets.QMessageBox.warning(self, __app_tittle__,
                                           'Memory usage log of process `{}` is not found!'.format(p_name))
             return
 
-        g = d.groupby(['Process'])
-        items = list(g.groups.keys())
-        if len(items) != 1:
-            dlg = TreeItemsSelector(items, title='Select items to draw', item_cat='Process Information', parent=self)
+        length_lim = self._settings.value('length_limit', 100, type=int)
+        for key in scan.index[scan['samples'] < length_lim]:
+            logging.warning('{} dropped, not enough length'.format(key))
+        candidates = scan[scan['samples'] >= length_lim]
+
+        items = list(candidates.index)
+        if len(items) > 1:
+            details = {key: ('{}'.format(row.samples), '{:%Y-%m-%d %H:%M:%S}'.format(row.start),
+                             '{:%Y-%m-%d %H:%M:%S}'.format(row.end)) for key, row in candidates.iterrows()}
+            dlg = TreeItemsSelector(items, title='Select items to draw', item_cat='Process Information', parent=self,
+                                    details=details, detail_labels=('Samples', 'First', 'Last'))
             if dlg.exec() == QtWidgets.QDialog.Accepted:
                 items = dlg.items
             else:
@@ -436,46 +946,175 @@ class MemoryUsageMonitor(QtWidgets.QMainWindow):
         if not items:
             return
 
-        n = len(items)
-        self._progress.setRange(0, n)
-        self._progress.setValue(0)
+        # parsing every group at once is cheaper than matching most of them
+        groups = None if len(items) == len(scan) else scan.loc[list(items)]
+        self._start_log_parser(groups=groups, scan=scan)
+
+    def _on_memory_log_partial(self, d: pd.DataFrame):
+        """ Draw the part of the log loaded so far, at a rate following the cost of a draw """
+        if d.empty:
+            return
+        self._log_parts.append(d)
+        if time.monotonic() - self._partial_drawn < self._partial_gap:
+            return
+        t = time.monotonic()
+        self._log_frame = pd.concat(self._log_parts, ignore_index=True)
+        self._draw_runs(partial=True)
+        self._partial_drawn = time.monotonic()
+        self._partial_gap = max(1., 4 * (self._partial_drawn - t))
+
+    def _draw_memory_log(self, d: pd.DataFrame, shared=()):
+        """
+        :param shared: List
+            Shared memory backing `d`, the window owns it until the frame is cleared or replaced
+        """
+        # the views of the previous frame, parts and chart lines are dropped before its memory is released
+        self._log_parts = []
+        self._log_frame = d.reset_index(drop=True)
+        previous, self._log_shared = self._log_shared, list(shared)
+        self._draw_runs()
+        release_all(previous)
+
+    def _release_log_frame(self):
+        """ Clear the loaded runs and release the shared memory backing them """
+        self._log_frame = None
+        self._log_parts = []
+        release_all(self._log_shared)
+
+    def _on_job_cancelled(self, label):
+        # keep what was loaded before the job was cancelled
+        if self._log_parts:
+            self._draw_memory_log(pd.concat(self._log_parts, ignore_index=True))
+        self.statusBar().showMessage('{} cancelled'.format(label.rstrip(' .')), 5000)
+
+    def _cancel_job(self):
+        if self._job is not None:
+            self._job.cancel()
+
+    def _start_job(self, job: BackgroundJob):
+        """ Run a job in the worker thread, the running job is superseded: it is cancelled and ignored """
+        if self._job is not None:
+            # it stays connected until it ends: a result emitted before it saw the cancellation still reaches
+            # the handler, which releases its shared memory
+            self._job.cancel()
+        self._job = job
+        job.moveToThread(self._worker_thread)
+        job.ev.connect(self._on_assist_worker_thread_event)
+        job.queue.emit()
+
+    def _draw_runs(self, partial=False):
+        """
+        :param partial: bool
+            Set when the log is still being loaded, the progress dialog belongs to the loading job then
+        """
+        d = self._log_frame
         self._mpl_ax.clear()
         self._setup_plot_frame(False)
-        interval = self._settings.value('interval', 10, type=int)
-        length_lim = self._settings.value('length_limit', 100, type=int)
-        convert_to_hours = 60 * 60 / interval
-        not_empty_plot = False
-        for key, grp in g:
-            if key not in items or len(grp['rss']) < length_lim:
-                logging.warning('{} dropped, not selected or not enough length'.format(key))
-            else:
-                not_empty_plot = True
-                self._mpl_ax.plot(np.arange(len(grp['rss'])) / convert_to_hours, grp['rss'] / 1024 / 1024, label=key)
-            self._progress.setValue(self._progress.value() + 1)
-        if not_empty_plot:
-            self._mpl_ax.legend()
+        self._live_chart = False
+        if d is None or d.empty:
+            self._mpl_ax.figure.canvas.draw()
+            return
+        threshold = self._settings.value('leak_threshold', 0, type=float)
+        summary = run_summary(d, threshold=threshold if threshold > 0 else None)
+        reference = summary.index[0]
+        runs = align_runs(d)
+        progress = None if partial else self._progress
+        if progress is not None:
+            progress.setRange(0, len(runs))
+            progress.setValue(0)
+        if self._compare_diff and len(runs) > 1:
+            for key, (hours, rss) in diff_to_reference(runs, reference).items():
+                self._mpl_ax.plot(hours, rss, label='{} ({:+.1f} MB peak)'.format(
+                    key, summary.at[key, 'peak_vs_ref_mb']))
+                if progress is not None:
+                    progress.setValue(progress.value() + 1)
+            self._mpl_ax.axhline(0, color='w', linewidth=0.5)
+            self._mpl_ax.set_title('RSS difference (MB) to {}'.format(reference), color='w',
+                                   fontdict={'fontsize': 10})
+        else:
+            headroom = align_headroom(d)
+            for key in summary.index:
+                hours, rss = runs[key]
+                line = self._mpl_ax.plot(hours, rss, label='{} ({:+.2f} MB/h)'.format(
+                    key, summary.at[key, 'trend_mb_h']))[0]
+                if key in headroom:
+                    known = ~np.isnan(headroom[key])
+                    self._mpl_ax.fill_between(hours, rss, rss + np.where(known, headroom[key], 0), where=known,
+                                              color=line.get_color(), alpha=0.15, linewidth=0)
+                if progress is not None:
+                    progress.setValue(progress.value() + 1)
+        self._mpl_ax.set_xlabel('Hours since process start', color='w')
+        self._mpl_ax.legend()
+        worst = summary['trend_mb_h'].idxmax() if summary['trend_mb_h'].notna().any() else None
+        if worst is not None and not partial:
+            msg = 'Fastest growth {:+.2f} MB/h: {}'.format(summary.at[worst, 'trend_mb_h'], worst)
+            if threshold > 0:
+                msg += ', {:.1f} hours to {} MB'.format(summary.at[worst, 'hours_to_threshold'], threshold)
+            self.statusBar().showMessage(msg, 5000)
         self._mpl_ax.figure.canvas.draw()
-        self._progress.reset()
+        if progress is not None:
+            progress.reset()
+
+    def _toggle_compare_mode(self):
+        self._compare_diff = not self._compare_diff
+        if self._log_frame is not None and not self._live_chart:
+            self._draw_runs()
+        self.statusBar().showMessage('Compare runs: {}'.format('diff' if self._compare_diff else 'overlay'), 1000)
+
+    def _show_run_summary(self):
+        if self._log_frame is None or self._log_frame.empty:
+            return
+        threshold = self._settings.value('leak_threshold', 0, type=float)
+        RunSummaryDialog(run_summary(self._log_frame, threshold=threshold if threshold > 0 else None),
+                         parent=self).exec()
 
     def _open_memory_log(self):
-        log_path, _filter = QtWidgets.QFileDialog.getOpenFileName(
-            self, 'Select Memory Log file',
+        log_paths, _filter = QtWidgets.QFileDialog.getOpenFileNames(
+            self, 'Select Memory Log files',
             directory=self._settings.value('prev_log_dir', '.', type=str),
-            filter='Memory Log (*.log)')
-        if not log_path:
+            filter='Memory Log (*.log *.log.*);;Columnar Memory Log ({})'.format(
+                ' '.join('*' + ext for ext in COLUMNAR_EXTENSIONS)))
+        if not log_paths:
             return
-        self._settings.setValue('prev_log_dir', os.path.dirname(log_path))
+        self._settings.setValue('prev_log_dir', os.path.dirname(log_paths[0]))
+        self._load_memory_logs(log_paths)
+
+    def _open_memory_log_dir(self):
+        log_dir = QtWidgets.QFileDialog.getExistingDirectory(
+            self, 'Select a directory of Memory Logs',
+            directory=self._settings.value('prev_log_dir', '.', type=str))
+        if not log_dir:
+            return
+        self._settings.setValue('prev_log_dir', log_dir)
+        self._load_memory_logs([log_dir])
+
+    def _load_memory_logs(self, log_paths):
         # firstly stop monitor
         self._on_stop()
-        p_name = self._settings.value('process_name', '', type=str)
+        self._unsubscribe_agents()
+        self._release_log_frame()
+        self._log_paths = list(log_paths)
+        # the logs are scanned first, only the selected groups are parsed then
+        self._start_log_parser(scan=True)
 
-        if self._log_parse_runnable is not None:
-            self._log_parse_runnable.ev.disconnect(self._on_assist_worker_thread_event)
-        # pass image to worker
-        self._log_parse_runnable = MemoryLogParserRunnable(log_path, p_name)
-        self._log_parse_runnable.moveToThread(self._worker_thread)
-        self._log_parse_runnable.ev.connect(self._on_assist_worker_thread_event)
-        self._log_parse_runnable.queue.emit()
+    def _start_log_parser(self, groups=None, scan=None):
+        """ Scan the logs for their processes, or parse the samples of the given groups (all if None)
+        :param scan: pd.DataFrame, bool or None
+            True to scan the logs, the result of the scan to parse them
+        """
+        p_name = self._settings.value('process_name', '', type=str)
+        workers = self._settings.value('parse_workers', 0, type=int)
+        workers = workers if workers > 0 else None
+        error = 'Failed to parse memory log {}'.format(', '.join(self._log_paths))
+        if scan is True:
+            job = BackgroundJob('memory_log_keys', scan_memory_logs, (self._log_paths, p_name, workers),
+                                'Scanning ...', error)
+        else:
+            shared = []
+            job = BackgroundJob('memory_log', load_memory_logs,
+                                (self._log_paths, p_name, workers, groups), 'Parsing ...', error,
+                                partial=True, shared=shared, kwargs={'shared': shared, 'scan': scan})
+        self._start_job(job)
 
     def center(self):
         frame_gm = self.frameGeometry()
@@ -489,10 +1128,7 @@ if __name__ == "__main__":
     # enable logging
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        fmt='%(asctime)s %(levelname)-8s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
     # file output to record memory usage
     fh = logging.FileHandler('memory.log')
     fh.setFormatter(formatter)
@@ -8,42 +8,311 @@
 #   last modified: 2020-01-08 10:04:22
 # *****************************************************
 
+import io
 import re
-import logging
+import csv
+import itertools
+import collections
+import numpy as np
 import pandas as pd
+from typing import Iterator, Iterable, Tuple
 
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# timestamps of records have milliseconds since sub-second sampling, older logs have seconds only
+TIMESTAMP_FORMAT = 'ISO8601'
+# one sample per line: `<date> <time>[.ms] ... [pid]-[name]-[create time] - [rss, vms]` and optional
+# extra fields ` {name=value, ...}`, e.g. system and cgroup memory
+_RECORD_PATTERN = r'^(\S+ \S+) [^\n]*? \[(\d+)\]-\[({name})\]-\[([^\]\n]*)\] - \[(\d+), ?(\d+)\](?: \{{([^}}\n]*)\}})?'
+# the keys of a record only: name and create time
+_KEY_PATTERN = r'\]-\[({name})\]-\[([^\]\n]*)\] - \[\d'
+# a record without its timestamp, matched from the literal `]-[` instead of every line start
+_GROUP_PATTERN = r'\[(\d+)\]-\[({name})\]-\[([^\]\n]*)\] - \[(\d+), ?(\d+)\](?: \{{([^}}\n]*)\}})?'
+_EXTRA_REGEX = re.compile(r'(\w+)=(-?\d+)')
+_EXTRA_KEY_REGEX = re.compile(r'^\w+$')
+_TIMESTAMP_REGEX = re.compile(r'\S+ \S+')
+RECORD_COLUMNS = ['timestamp', 'pid', 'name', 'create_time', 'rss', 'vms']
+# label of a process in the frames drawn by the viewer
+PROCESS_LABEL = '[{}] - started [{}]'
 
-def parse_memory_log(f, exe_name=None) -> pd.DataFrame:
-    """ Parse memory monitor log """
-    if exe_name is None:
-        pattern = r'.* \[(.*)\]-\[(.*)\]-\[(.*)\] - \[(.*)\]'
+
+def _record_regex(exe_name=None, pattern=_RECORD_PATTERN, names=None):
+    """ Compile a record pattern for any name, the given name or one of the given names """
+    if names is not None:
+        name = '|'.join(re.escape(n) for n in sorted(set(names), key=len, reverse=True))
     else:
-        pattern = r'.* \[(.*)\]-\[{}]-\[(.*)\] - \[(.*)\]'.format(exe_name)
-
-    compile_regex = re.compile(pattern, re.IGNORECASE)
-    rst = []
-    with open(f, 'r') as b:
-        for line in b.readlines():
-            # g = re.search(pattern, line)
-            g = compile_regex.search(line)
-            if g:
-                groups = g.groups()
-                if exe_name is None:
-                    exe_name = groups[1]
-                try:
-                    full_name = '[{}] - started [{}]'.format(exe_name, groups[-2])
-                    data = [full_name, ] + [int(x) for x in groups[-1].split(',')]
-                    rst.append(tuple(data))
-                except Exception as e:
-                    logging.error(repr(e), exc_info=True)
-
-    df = pd.DataFrame(rst, columns=['Process', 'rss', 'vms'])
-    return df
+        name = r'[^\]\n]*' if exe_name is None else re.escape(exe_name)
+    return re.compile(pattern.format(name=name), re.IGNORECASE | re.MULTILINE)
+
+
+def _iter_blocks(f, chunk_size: int, progress=None) -> Iterator[str]:
+    """ Read a log in blocks of complete lines
+    :param progress: callable or None
+        Called with the number of bytes read since the previous call, before every block
+    """
+    with open(f, 'rb') as b:
+        tail = b''
+        while True:
+            block = b.read(chunk_size)
+            if progress is not None:
+                progress(len(block))
+            if block:
+                data = tail + block
+                pos = data.rfind(b'\n') + 1
+                data, tail = data[:pos], data[pos:]
+            else:
+                data, tail = tail, b''
+            # lines are split before decoding so multi-byte characters are never cut
+            yield data.decode('utf-8', errors='replace')
+            if not block:
+                break
+
+
+def _extra_columns(extras) -> dict:
+    """ Columns (float, NaN when missing) of the extra fields of the records
+
+    The `key=value, ...` fields of all the records are read at once as `key,value,...` rows by the C parser
+    of pandas, keys as categories. Fields not written by `utils.sampler.format_record` are matched record
+    by record instead.
+    """
+    n = max(map(str.count, extras, itertools.repeat('=')), default=0)
+    if not n:
+        return {}
+    try:
+        d = pd.read_csv(io.StringIO('\n'.join(extras).replace('=', ',')), header=None, names=range(2 * n),
+                        dtype={i: 'category' for i in range(0, 2 * n, 2)}, skipinitialspace=True,
+                        skip_blank_lines=False, quoting=csv.QUOTE_NONE, keep_default_na=False, na_values=[''])
+    except (ValueError, pd.errors.ParserError):
+        return _match_extra_columns(extras)
+    columns = {}
+    for k in range(0, 2 * n, 2):
+        keys, values = d[k], d[k + 1]
+        # keys are words, values integers and every key has its value
+        if (values.dtype.kind not in 'if' or (values.dropna() % 1 != 0).any() or
+                not all(_EXTRA_KEY_REGEX.match(key) for key in keys.cat.categories) or
+                (keys.notna() != values.notna()).any()):
+            return _match_extra_columns(extras)
+        # rows are the records in order, trailing records without fields are left out
+        codes, values = keys.cat.codes.to_numpy(), values.to_numpy(dtype=np.float64)
+        for i, key in enumerate(keys.cat.categories):
+            if key not in columns:
+                columns[key] = np.full(len(extras), np.nan)
+            sel = np.flatnonzero(codes == i)
+            columns[key][sel] = values[sel]
+    return {key: columns[key] for key in sorted(columns)}
+
+
+def _match_extra_columns(extras) -> dict:
+    """ Same as `_extra_columns`, the fields are matched record by record """
+    columns = {}
+    for i, text in enumerate(extras):
+        if text:
+            for key, value in _EXTRA_REGEX.findall(text):
+                if key not in columns:
+                    columns[key] = np.full(len(extras), np.nan)
+                columns[key][i] = float(value)
+    return {key: columns[key] for key in sorted(columns)}
+
+
+def _records_frame(rows: list) -> pd.DataFrame:
+    """ Convert matched records to typed columns, extra fields follow `RECORD_COLUMNS` """
+    ts, pid, name, ct, rss, vms, extras = zip(*rows)
+    d = pd.DataFrame({
+        'timestamp': pd.to_datetime(pd.Series(ts), format=TIMESTAMP_FORMAT),
+        'pid': np.array(pid, dtype=np.uint32),
+        'name': pd.Series(name, dtype=object),
+        'create_time': pd.to_datetime(pd.Series(ct), format=TIME_FORMAT, errors='coerce'),
+        'rss': np.array(rss, dtype=np.int64),
+        'vms': np.array(vms, dtype=np.int64),
+    }, columns=RECORD_COLUMNS)
+    if any(extras):
+        d = d.assign(**_extra_columns(extras))
+    return d
+
+
+def iter_memory_log(f, exe_name=None, chunk_size=1 << 24,
+                    groups: Iterable[Tuple[str, str]] = None, progress=None) -> Iterator[pd.DataFrame]:
+    """ Stream a memory monitor log as typed column chunks
+
+    The log is read in blocks of `chunk_size` characters and every block is matched at once,
+    memory usage is bounded by the block size whatever the size of the log is.
+
+    :param f: str
+        Path of the memory log
+    :param exe_name: str or None
+        Only parse records of the process with given name if set
+    :param chunk_size: int
+        Number of bytes read at once
+    :param groups: Iterable or None
+        Only parse records of the processes with given (name, create time) pairs if set, see `scan_memory_log`
+    :param progress: callable or None
+        Called with the number of bytes read since the previous call, it may raise to stop parsing
+    :return: Iterator
+        DataFrames with columns of `RECORD_COLUMNS`, followed by the extra fields of the records if any
+    """
+    if groups is not None:
+        yield from _iter_group_records(f, set(groups), chunk_size, progress)
+        return
+    regex = _record_regex(exe_name)
+    for text in _iter_blocks(f, chunk_size, progress):
+        rows = regex.findall(text)
+        if rows:
+            yield _records_frame(rows)
+
+
+def _iter_group_records(f, groups: set, chunk_size: int, progress=None) -> Iterator[pd.DataFrame]:
+    """ Parse records of the given (name, create time) pairs only
+
+    Records are searched from their (selected) names, the timestamp is only read for the matched records,
+    so the cost follows the number of selected records rather than the size of the log.
+    """
+    regex = _record_regex(names=[name for name, _ in groups], pattern=_GROUP_PATTERN)
+    for text in _iter_blocks(f, chunk_size, progress):
+        rows = []
+        for m in regex.finditer(text):
+            if (m.group(2), m.group(3)) in groups:
+                ts = _TIMESTAMP_REGEX.match(text, text.rfind('\n', 0, m.start()) + 1).group()
+                # records without extra fields have no extras group, `findall` gives '' for it as well
+                rows.append((ts,) + m.groups()[:5] + (m.group(6) or '',))
+        if rows:
+            yield _records_frame(rows)
+
+
+def scan_memory_log(f, exe_name=None, chunk_size=1 << 24, progress=None) -> pd.DataFrame:
+    """ Collect the processes of a memory log without parsing the samples
+
+    Only the keys (name and create time) of the records are matched and counted, the time span of a process
+    is read from the lines of its first and last records in every block. This is several times faster than
+    parsing the log, whatever the number of processes.
+
+    :param progress: callable or None
+        See `iter_memory_log`
+    :return: pd.DataFrame
+        Indexed by process label, columns are name, create_time (as recorded), samples, start and end
+    """
+    regex = _record_regex(exe_name, _KEY_PATTERN)
+    counts = collections.Counter()
+    spans = {}
+    for text in _iter_blocks(f, chunk_size, progress):
+        # offsets of the first and last records of every key in the block, found in the same pass
+        first_pos, last_pos = {}, {}
+        for m in regex.finditer(text):
+            key = m.groups()
+            last_pos[key] = m.start()
+            first_pos.setdefault(key, last_pos[key])
+            counts[key] += 1
+        for key, pos in first_pos.items():
+            first = _TIMESTAMP_REGEX.match(text, text.rfind('\n', 0, pos) + 1).group()
+            last = _TIMESTAMP_REGEX.match(text, text.rfind('\n', 0, last_pos[key]) + 1).group()
+            spans.setdefault(key, [first, last])[1] = last
+    keys = list(counts)
+    return _scan_frame([k[0] for k in keys], [k[1] for k in keys], [counts[k] for k in keys],
+                       [spans[k][0] for k in keys], [spans[k][1] for k in keys])
+
+
+def _scan_frame(names, cts, samples, start, end) -> pd.DataFrame:
+    rst = pd.DataFrame({
+        'name': pd.Series(names, dtype=object),
+        'create_time': pd.Series(cts, dtype=object),
+        'samples': np.array(samples, dtype=np.int64),
+        'start': pd.to_datetime(pd.Series(start, dtype=object), format=TIMESTAMP_FORMAT),
+        'end': pd.to_datetime(pd.Series(end, dtype=object), format=TIMESTAMP_FORMAT),
+    }, columns=['name', 'create_time', 'samples', 'start', 'end'])
+    # labels are the ones of `to_process_frame`, unknown create times are left empty
+    ct_labels = pd.to_datetime(rst['create_time'], format=TIME_FORMAT, errors='coerce').dt.strftime(TIME_FORMAT)
+    rst.index = pd.Index([PROCESS_LABEL.format(n, ct) for n, ct in zip(names, ct_labels.fillna(''))],
+                         dtype=object, name='Process')
+    return rst
+
+
+def scan_records(d: pd.DataFrame) -> pd.DataFrame:
+    """ Same as `scan_memory_log` for typed records, e.g. of a columnar file
+    :param d: pd.DataFrame
+        Columns timestamp, name and create_time are used, the samples are not needed
+    """
+    g = d.groupby(['name', 'create_time'], sort=False, dropna=False)['timestamp']
+    size, start, end = g.size(), g.min(), g.max()
+    cts = ['' if pd.isnull(ct) else ct.strftime(TIME_FORMAT) for ct in size.index.get_level_values(1)]
+    return _scan_frame(list(size.index.get_level_values(0)), cts, size.to_numpy(), list(start), list(end))
+
+
+def merge_scans(scans) -> pd.DataFrame:
+    """ Merge the results of `scan_memory_log` over several (rotated) logs """
+    scans = [d for d in scans if len(d)]
+    if not scans:
+        return _scan_frame([], [], [], [], [])
+    d = pd.concat(scans).groupby(level=0, sort=False).agg(
+        {'name': 'first', 'create_time': 'first', 'samples': 'sum', 'start': 'min', 'end': 'max'})
+    d.index.name = 'Process'
+    return d
+
+
+def to_process_frame(d: pd.DataFrame) -> pd.DataFrame:
+    """ Convert typed records to the frame drawn by the viewer, processes are labeled by name and create time
+    :return: pd.DataFrame
+        Columns are `Process`, `Time`, `rss` and `vms`, followed by the extra fields of the records if any
+    """
+    name_codes, names = pd.factorize(d['name'])
+    ct_codes, cts = pd.factorize(d['create_time'])
+    cts = ['' if pd.isnull(ct) else ct.strftime(TIME_FORMAT) for ct in cts] + ['']
+    # factorize the (name, create time) pairs through the combined codes, -1 (NaT) is mapped to ''
+    n_ct = len(cts)
+    uniques, codes = np.unique(name_codes.astype(np.int64) * n_ct + ct_codes % n_ct, return_inverse=True)
+    labels = np.array([PROCESS_LABEL.format(names[k // n_ct], cts[k % n_ct]) for k in uniques],
+                      dtype=object)
+    rst = pd.DataFrame({
+        'Process': labels[codes],
+        'Time': d['timestamp'].to_numpy(),
+        'rss': d['rss'].to_numpy(),
+        'vms': d['vms'].to_numpy(),
+    }, columns=['Process', 'Time', 'rss', 'vms'])
+    for c in d.columns[len(RECORD_COLUMNS):]:
+        rst[c] = d[c].to_numpy()
+    return rst
+
+
+def process_start_times(d: pd.DataFrame) -> pd.Series:
+    """ Start time of every process of a frame returned by `to_process_frame`
+    The create time in the label is used, the first sample of the process if the create time is unknown.
+    :return: pd.Series
+        Start time indexed by process label
+    """
+    first = d.groupby('Process', sort=False)['Time'].min()
+    ct = pd.to_datetime(first.index.str.extract(r'started \[([^\]]*)\]$', expand=False),
+                        format=TIME_FORMAT, errors='coerce')
+    return pd.Series(np.where(ct.isna(), first.to_numpy(), ct.to_numpy()), index=first.index).astype(first.dtype)
+
+
+def parse_memory_log(f, exe_name=None, groups: Iterable[Tuple[str, str]] = None,
+                     progress=None, partial=None) -> pd.DataFrame:
+    """ Parse memory monitor log
+
+    :param f: str
+        Path of the memory log
+    :param exe_name: str or None
+        Only parse records of the process with given name if set
+    :param groups: Iterable or None
+        Only parse records of the processes with given (name, create time) pairs if set
+    :param progress: callable or None
+        See `iter_memory_log`
+    :param partial: callable or None
+        Called with the frame of every parsed block, e.g. to draw a log while it is parsed
+    :return: pd.DataFrame
+        Columns are `Process`, `Time`, `rss` and `vms`
+    """
+    # labels do not depend on the block, so the frames of the blocks are concatenated as they are
+    frames = []
+    for chunk in iter_memory_log(f, exe_name, groups=groups, progress=progress):
+        frames.append(to_process_frame(chunk))
+        if partial is not None:
+            partial(frames[-1])
+    if not frames:
+        return pd.DataFrame(columns=['Process', 'Time', 'rss', 'vms'])
+    return pd.concat(frames, ignore_index=True)
 
 
 if __name__ == '__main__':
+    import sys
     import argparse
-    import numpy as np
     import matplotlib.pyplot as plt
     from utils.ema import exponential_moving_average
     # parse opt
@@ -60,8 +329,8 @@ if __name__ == '__main__':
                           help='Minimal data point for analysis',
                           type=int, default=100)
     argtable.add_argument('--interval', dest='interval',
-                          help='Sampling time interval in seconds',
-                          type=int, default=10)
+                          help='Ignored, samples are drawn at their own (millisecond) timestamps',
+                          type=float, default=10)
     argtable.add_argument('--ema', dest='ema',
                           action='store_true',
                           help='Set to use Exponential Moving Average to smooth data',
@@ -69,25 +338,52 @@ if __name__ == '__main__':
     argtable.add_argument('--ema_n', dest='ema_n',
                           help='N of the EMA function',
                           type=int, default=10)
+    argtable.add_argument('--analyze', dest='analyze',
+                          action='store_true',
+                          help='Set to print leak statistics of every process',
+                          default=False)
+    argtable.add_argument('--threshold', dest='threshold',
+                          help='Memory threshold (MB) used to forecast time to threshold',
+                          type=float, default=None)
+    argtable.add_argument('--report', dest='report',
+                          help='Render charts of every process to given directory with an HTML index instead of '
+                               'showing the chart',
+                          default='')
+    argtable.add_argument('--workers', dest='workers',
+                          help='Number of worker processes used to render the report',
+                          type=int, default=None)
 
     opt = argtable.parse_args()
 
-    d = parse_memory_log(opt.log)
+    from convert_log import is_columnar, load_memory_table
+    d = load_memory_table(opt.log) if is_columnar(opt.log) else parse_memory_log(opt.log)
+    if opt.analyze:
+        from utils.leak import leak_report
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(leak_report(d, opt.threshold))
+
+    if opt.report:
+        from report_log import render_report
+        index = render_report(d, opt.report, opt.workers, min_samples=opt.ignore_n if opt.ignore else 0)
+        print('Report is written to {}'.format(index))
+        sys.exit(0)
 
     fig, ax = plt.subplots(figsize=(10, 4))
-    for key, grp in d.groupby(['Process']):
+    for key, grp in d.groupby('Process', sort=False):
         dat_len = len(grp['rss'])
         if opt.ignore and dat_len < opt.ignore_n:
             continue
+        # elapsed minutes, the sampling interval may be irregular (adaptive) or sub-second
+        minutes = (grp['Time'] - grp['Time'].iloc[0]).dt.total_seconds().to_numpy() / 60
         if opt.ema:
             ax.plot(
-                np.arange(dat_len) * opt.interval / 60,
+                minutes,
                 exponential_moving_average(grp['rss'], opt.ema_n),
                 label=key
             )
         else:
             ax.plot(
-                np.arange(dat_len) * opt.interval / 60,
+                minutes,
                 grp['rss'],
                 label=key
             )
@@ -0,0 +1,116 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 11:40
+#           @file: report_log.py
+#          @brief: Render memory usage charts of every process in parallel
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 11:40:00
+# *****************************************************
+
+import os
+import html
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from utils.decimate import minmax_indices
+from utils.leak import leak_report
+
+_MB = 1024 * 1024
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_chart(task) -> str:
+    """ Render one chart to a PNG file in a worker process
+    :param task: Tuple
+        (file path, title, [(label, time, rss, vms), ...], figure size, dpi)
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    path, title, series, size, dpi = task
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    for label, t, rss, vms in series:
+        line = ax.plot(t, rss, '-', label=label)[0]
+        if vms is not None:
+            ax.plot(t, vms, '--', color=line.get_color(), linewidth=0.8, label='VM Size')
+    ax.set_title(title, fontdict={'fontsize': 10})
+    ax.set_ylabel('Usage (MB)')
+    ax.set_xlabel('Date')
+    ax.grid(True)
+    if len(series) <= 10:
+        ax.legend(fontsize=8)
+    fig.autofmt_xdate()
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def render_report(d: pd.DataFrame, out_dir, workers=None, points=2000, size=(10, 4), dpi=100,
+                  min_samples=0) -> str:
+    """ Render one chart per process and an aggregate chart with a process pool, then write an HTML index
+
+    Series are decimated with min/max decimation before being sent to workers, so the cost of a chart
+    does not depend on the length of the log and charts are rendered independently of each other.
+
+    :param d: pd.DataFrame
+        Memory log returned by `parse_memory_log` or `load_memory_table`
+    :param out_dir: str
+        Output directory of images and `index.html`
+    :param workers: int or None
+        Number of worker processes, number of CPUs if None
+    :param points: int
+        Maximal number of points of every series
+    :param min_samples: int
+        Processes with less samples are ignored
+    :return: str
+        Path of the HTML index
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    report = leak_report(d)
+    report = report[report['samples'] >= min_samples]
+
+    d = d[d['Process'].isin(report.index)].sort_values(['Process', 'Time'], kind='stable')
+    tasks = []
+    aggregate = []
+    for i, (key, grp) in enumerate(d.groupby('Process', sort=True)):
+        rss = grp['rss'].to_numpy() / _MB
+        idx = minmax_indices(rss, points)
+        t = grp['Time'].to_numpy()[idx]
+        vms = grp['vms'].to_numpy()[idx] / _MB
+        name = '{:04d}.png'.format(i)
+        tasks.append((os.path.join(out_dir, name), key, [('Mem Usage', t, rss[idx], vms)], size, dpi))
+        # the aggregate chart has many series, decimate further
+        idx_a = minmax_indices(rss, max(points // 4, 2))
+        aggregate.append((key, grp['Time'].to_numpy()[idx_a], rss[idx_a], None))
+    tasks.append((os.path.join(out_dir, 'aggregate.png'), 'All processes', aggregate, size, dpi))
+
+    workers = workers or os.cpu_count() or 1
+    # workers are spawned rather than forked from a process that may run threads
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        list(executor.map(_render_chart, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    rows = []
+    for task, (key, r) in zip(tasks, report.iterrows()):
+        rows.append('<tr><td><a href="{img}">{key}</a></td><td>{n}</td><td>{start}</td><td>{end}</td>'
+                    '<td>{peak:.1f}</td><td>{trend:+.2f}</td></tr>'.format(
+                        img=html.escape(os.path.basename(task[0])), key=html.escape(key), n=r['samples'],
+                        start=r['start'], end=r['end'], peak=r['peak_mb'], trend=r['trend_mb_h']))
+    index = os.path.join(out_dir, 'index.html')
+    with open(index, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Memory Usage Report</title></head>\n'
+                '<body>\n<h1>Memory Usage Report</h1>\n<p><img src="aggregate.png" alt="All processes"></p>\n'
+                '<table border="1" cellspacing="0" cellpadding="4">\n'
+                '<tr><th>Process</th><th>Samples</th><th>Start</th><th>End</th><th>Peak (MB)</th>'
+                '<th>Trend (MB/h)</th></tr>\n')
+        f.write('\n'.join(rows))
+        f.write('\n</table>\n</body></html>\n')
+    return index
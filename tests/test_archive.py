@@ -0,0 +1,23 @@
+import os
+from utils.archive import ArchiveWriter, read_archive
+from utils.sampler import Sample
+
+
+def _write(path, start, n):
+    writer = ArchiveWriter(path)
+    for i in range(start, start + n):
+        writer.append(Sample(1.7e9 + i, 10, 'svc', '2026-01-01 00:00:00', 1000 + i, 2000))
+    writer.close()
+
+
+def test_append_after_partial_block(tmp_path):
+    path = str(tmp_path / 'memory.mma')
+    _write(path, 0, 100)
+    _write(path, 100, 100)
+    # the writer was killed while writing the last block
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert list(read_archive(path)['rss']) == list(range(1000, 1100))
+
+    _write(path, 200, 100)
+    assert list(read_archive(path)['rss']) == list(range(1000, 1100)) + list(range(1200, 1300))
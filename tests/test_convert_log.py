@@ -0,0 +1,46 @@
+from convert_log import scan_memory_logs, load_memory_logs, convert_memory_log
+from utils.shm import release_all
+
+LOGS = {
+    'memory.log.1': '''\
+2026-01-01 08:00:00.000 INFO    : [10]-[svc]-[2026-01-01 07:59:00] - [1000, 2000]
+2026-01-01 08:00:00.000 INFO    : [20]-[plain]-[2026-01-01 07:58:00] - [3000, 4000]
+''',
+    'memory.log': '''\
+2026-01-01 08:00:01.000 INFO    : [10]-[svc]-[2026-01-01 07:59:00] - [1100, 2000] {sys_available=4900, sys_used=20}
+2026-01-01 08:00:01.000 INFO    : [20]-[plain]-[2026-01-01 07:58:00] - [3100, 4000]
+''',
+}
+
+
+def test_workers_write_rotated_logs_in_place(tmp_path):
+    for name, text in LOGS.items():
+        (tmp_path / name).write_text(text)
+    scan = scan_memory_logs([str(tmp_path)], workers=1)
+    shared = []
+    d = load_memory_logs([str(tmp_path)], workers=2, shared=shared, scan=scan)
+    try:
+        # one frame in shared memory, not a concatenation of the logs
+        assert len(shared) == 1
+        expected = load_memory_logs([str(tmp_path)], workers=1)
+        assert list(d.columns) == list(expected.columns)
+        assert list(d['Process'].astype(str)) == list(expected['Process'])
+        assert list(d['rss']) == [1000, 3000, 1100, 3100]
+        assert list(d['sys_available'].isna()) == [True, True, False, True]
+    finally:
+        del d
+        release_all(shared)
+
+
+def test_columnar_file_loads_selected_groups(tmp_path):
+    log = tmp_path / 'memory.log'
+    log.write_text(LOGS['memory.log.1'] + LOGS['memory.log'].replace(' {sys_available=4900, sys_used=20}', ''))
+    for ext in ('.parquet', '.feather', '.npz', '.mma'):
+        dst = str(tmp_path / ('memory' + ext))
+        convert_memory_log([str(log)], dst)
+        scan = scan_memory_logs([dst], workers=1)
+        assert list(scan['samples']) == [2, 2]
+        groups = scan[scan['name'] == 'plain']
+        d = load_memory_logs([dst], workers=1, groups=groups)
+        assert list(d['Process'].astype(str)) == list(groups.index) * 2
+        assert list(d['rss']) == [3000, 3100]
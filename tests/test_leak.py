@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from utils.leak import leak_report
+
+_MB = 1024 * 1024
+
+
+def _frame(series: dict) -> pd.DataFrame:
+    t = pd.date_range('2026-01-01', periods=5000, freq='10s')
+    return pd.concat([pd.DataFrame({'Process': k, 'Time': t, 'rss': v.astype(np.int64)}) for k, v in series.items()])
+
+
+def test_steady_process_is_no_sawtooth():
+    rng = np.random.default_rng(0)
+    rst = leak_report(_frame({'flat': 200 * _MB + rng.integers(-2, 3, 5000) * 4096}))
+    assert rst.at['flat', 'drops'] == 0
+    assert not rst.at['flat', 'sawtooth']
+
+
+def test_change_of_growth_rate():
+    i = np.arange(5000)
+    rst = leak_report(_frame({
+        'linear': 100 * _MB + i * 1000,
+        'change': 100 * _MB + np.where(i < 2500, i * 200, 2500 * 200 + (i - 2500) * 3000),
+    }))
+    assert pd.isna(rst.at['linear', 'change_time'])
+    assert np.isnan(rst.at['linear', 'slope_before_mb_h'])
+    change = rst.loc['change']
+    assert abs((change['change_time'] - pd.Timestamp('2026-01-01 06:56:40')).total_seconds()) < 3600
+    assert change['slope_after_mb_h'] > 5 * change['slope_before_mb_h']
@@ -0,0 +1,27 @@
+import numpy as np
+from parse_log import parse_memory_log, scan_memory_log
+
+LOG = '''\
+2026-01-01 08:00:00.000 INFO    : [10]-[svc]-[2026-01-01 07:59:00] - [1000, 2000] {sys_available=5000, sys_used=10}
+2026-01-01 08:00:00.000 INFO    : [20]-[plain]-[2026-01-01 07:58:00] - [3000, 4000]
+2026-01-01 08:00:01.000 INFO    : [10]-[svc]-[2026-01-01 07:59:00] - [1100, 2000] {sys_available=4900, sys_used=20}
+2026-01-01 08:00:01.000 INFO    : [20]-[plain]-[2026-01-01 07:58:00] - [3100, 4000]
+'''
+
+
+def test_parse_selected_groups_with_and_without_extra_fields(tmp_path):
+    f = tmp_path / 'memory.log'
+    f.write_text(LOG)
+    scan = scan_memory_log(str(f))
+    groups = list(zip(scan['name'], scan['create_time']))
+    assert len(groups) == 2
+
+    d = parse_memory_log(str(f), groups=groups)
+    assert len(d) == 4
+    svc = d[d['Process'].str.startswith('[svc]')]
+    plain = d[d['Process'].str.startswith('[plain]')]
+    assert list(svc['sys_available']) == [5000, 4900]
+    assert np.isnan(plain['sys_available']).all()
+    # same frame as a parse of the whole log
+    full = parse_memory_log(str(f))
+    assert list(full.columns) == list(d.columns)
@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 16:20
+#           @file: compare.py
+#          @brief: Align runs of a process by start time and compare them
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 16:20:00
+# *****************************************************
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from parse_log import process_start_times
+from utils.leak import leak_report
+from utils.sampler import oom_headroom
+
+_MB = 1024 * 1024
+
+
+def align_runs(d: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """ Hours since the start of its process and rss (MB) of every sample, per process
+    :param d: pd.DataFrame
+        Frame returned by `parse_memory_log` or `load_memory_logs`
+    :return: Dict
+        process label -> (hours, rss)
+    """
+    starts = process_start_times(d)
+    rst = {}
+    for key, grp in d.groupby('Process', sort=False):
+        hours = (grp['Time'] - starts[key]).dt.total_seconds().to_numpy() / 3600
+        rst[key] = (hours, grp['rss'].to_numpy() / _MB)
+    return rst
+
+
+def align_headroom(d: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """ OOM headroom (MB, see `utils.sampler.oom_headroom`) of every sample, in the order of `align_runs`
+    :return: Dict
+        process label -> headroom, NaN for samples without memory context. Runs without context are left out
+    """
+    if 'sys_available' not in d.columns and 'cg_max' not in d.columns:
+        return {}
+    nan = pd.Series(np.nan, index=d.index)
+    headroom = pd.Series(oom_headroom(d.get('sys_available', nan), d.get('cg_current', nan), d.get('cg_max', nan)),
+                         index=d.index) / _MB
+    rst = {}
+    for key, grp in headroom.groupby(d['Process'], sort=False):
+        if grp.notna().any():
+            rst[key] = grp.to_numpy()
+    return rst
+
+
+def diff_to_reference(runs: Dict[str, Tuple[np.ndarray, np.ndarray]], reference: str
+                      ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """ Difference of rss of every run to the reference run, over the elapsed time covered by both
+    The reference is linearly interpolated at the samples of the other run.
+    """
+    t_ref, y_ref = runs[reference]
+    order = np.argsort(t_ref, kind='stable')
+    t_ref, y_ref = t_ref[order], y_ref[order]
+    rst = {}
+    for key, (t, y) in runs.items():
+        if key == reference or not len(t_ref):
+            continue
+        mask = (t >= t_ref[0]) & (t <= t_ref[-1])
+        rst[key] = (t[mask], y[mask] - np.interp(t[mask], t_ref, y_ref))
+    return rst
+
+
+def run_summary(d: pd.DataFrame, reference=None, threshold=None) -> pd.DataFrame:
+    """ Summary statistics of every run, sorted by start time
+    :param reference: str or None
+        Label of the reference run, the first started run if None
+    :return: pd.DataFrame
+        Indexed by process label, columns are start, samples, hours, mean_mb, peak_mb, last_mb, trend_mb_h,
+        hours_to_threshold and peak_vs_ref_mb (peak rss relative to the reference run), followed by
+        min_headroom_mb (lowest OOM headroom) when memory context is recorded
+    """
+    starts = process_start_times(d)
+    g = d.groupby('Process', sort=False)['rss']
+    report = leak_report(d, threshold)
+    rst = pd.DataFrame({
+        'start': starts,
+        'samples': g.size(),
+        'hours': report['hours'],
+        'mean_mb': g.mean() / _MB,
+        'peak_mb': g.max() / _MB,
+        'last_mb': report['last_mb'],
+        'trend_mb_h': report['trend_mb_h'],
+        'hours_to_threshold': report['hours_to_threshold'],
+    }).sort_values('start', kind='stable')
+    if reference is None:
+        reference = rst.index[0]
+    rst['peak_vs_ref_mb'] = rst['peak_mb'] - rst.at[reference, 'peak_mb']
+    headroom = align_headroom(d)
+    if headroom:
+        rst['min_headroom_mb'] = pd.Series({k: np.nanmin(v) for k, v in headroom.items()}, dtype=np.float64)
+    return rst
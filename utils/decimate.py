@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 11:32
+#           @file: decimate.py
+#          @brief: Peak preserving decimation of long series for plotting
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 11:32:00
+# *****************************************************
+
+import numpy as np
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """ Indices of the samples kept by min/max decimation
+
+    The series is split into n_out / 2 buckets and the minimum and the maximum of every bucket are kept,
+    so spikes survive the decimation. Indices are sorted, the same indices can be used for other columns.
+
+    :param y: array like
+        The series, NaN is not allowed
+    :param n_out: int
+        Maximal number of kept samples
+    :return: np.ndarray
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= n_out or n_out < 2:
+        return np.arange(n)
+    buckets = n_out // 2
+    size = -(-n // buckets)
+    buckets = -(-n // size)
+    padded = np.empty(buckets * size, dtype=np.float64)
+    padded[:n] = y
+    # pad the last bucket with its own first value, it never changes min or max
+    padded[n:] = y[(buckets - 1) * size]
+    padded = padded.reshape(buckets, size)
+    offset = np.arange(buckets) * size
+    i_min = offset + np.argmin(padded, axis=1)
+    i_max = offset + np.argmax(padded, axis=1)
+    return np.unique(np.concatenate((i_min, i_max)))
@@ -0,0 +1,147 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 14:30
+#           @file: exporter.py
+#          @brief: Prometheus/OpenMetrics style pull endpoint of the latest samples
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 14:30:00
+# *****************************************************
+
+import re
+import logging
+import threading
+from typing import List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.sampler import Sample
+from utils.wire import parse_address
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+_HELP = {
+    'rss': 'Resident set size of the process',
+    'vms': 'Virtual memory size of the process',
+    'sys_available': 'Memory available to processes on the host',
+    'sys_used': 'Memory used on the host (total - available)',
+    'swap_used': 'Swap used on the host',
+    'cg_current': 'Memory used by the cgroup of the process',
+    'cg_max': 'Memory limit of the cgroup of the process, 0 when unlimited',
+    'cg_anon': 'Anonymous memory of the cgroup of the process',
+    'cg_file': 'Page cache of the cgroup of the process',
+    'cg_inactive_file': 'Inactive (reclaimable) page cache of the cgroup of the process',
+    'sm_anon': 'Proportional set size of the anonymous mappings of the process',
+    'sm_file': 'Proportional set size of the file backed mappings of the process',
+    'sm_shmem': 'Proportional set size of the shared memory mappings of the process',
+    'sm_swap': 'Swapped out memory of the process',
+    'map_heap': 'Resident memory of the heap of the process',
+    'map_stack': 'Resident memory of the main stack of the process',
+    'map_anon': 'Resident memory of the other anonymous mappings of the process',
+    'map_file': 'Resident memory of the file backed mappings of the process',
+    'map_shmem': 'Resident memory of the shared memory mappings of the process',
+    'map_count': 'Number of memory mappings of the process',
+}
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_name(field: str) -> str:
+    # every documented field but the counts is a size in bytes
+    if field in _HELP and not field.endswith('_count'):
+        field += '_bytes'
+    return 'memory_monitor_' + re.sub(r'[^a-zA-Z0-9_]', '_', field)
+
+
+class MetricsExporter(object):
+    """ Serve the latest sample of every series over HTTP in the Prometheus text format
+
+    Samples are only stored by `update`, the exposition text is rendered once on the first scrape after an update
+    and served from cache by the next scrapes. Requests are handled in daemon threads, so neither the sampler nor
+    the Qt event loop is blocked by scrapes.
+    """
+
+    def __init__(self, address: str):
+        """
+        :param address: str
+            `host:port` or `[ipv6]:port` to listen on, `:port` listens on all interfaces
+        """
+        family, addr = parse_address(address)
+        self._latest = {}  # (source, pid, name, create time) -> Sample
+        self._lock = threading.Lock()
+        self._version = 0
+        self._cache = None
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.render()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            address_family = family
+
+        self._server = Server(addr, Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.debug('Metrics are served on {}'.format(self.address))
+
+    def update(self, samples: List[Sample], source=''):
+        """ Store the latest samples, `source` labels series of different agents """
+        with self._lock:
+            for s in samples:
+                self._latest[(source, s.pid, s.name, s.create_time)] = s
+            self._version += 1
+            self._cache = None
+
+    def discard(self, pid, source=''):
+        """ Drop series of an exited process """
+        with self._lock:
+            for key in [k for k in self._latest if k[0] == source and k[1] == pid]:
+                del self._latest[key]
+            self._version += 1
+            self._cache = None
+
+    def render(self) -> bytes:
+        with self._lock:
+            if self._cache is not None:
+                return self._cache
+            latest = list(self._latest.items())
+            version = self._version
+        metrics = {}
+        for (source, pid, name, ct), s in latest:
+            labels = 'name="{}",pid="{}",create_time="{}"'.format(_escape(name), pid, _escape(ct))
+            if source:
+                labels += ',source="{}"'.format(_escape(source))
+            values = dict(s.extra, rss=s.rss, vms=s.vms)
+            for field, value in values.items():
+                metrics.setdefault(field, []).append('{}{{{}}} {}'.format(_metric_name(field), labels, value))
+        lines = []
+        for field in sorted(metrics):
+            name = _metric_name(field)
+            lines.append('# HELP {} {}'.format(name, _HELP.get(field, field)))
+            lines.append('# TYPE {} gauge'.format(name))
+            lines.extend(metrics[field])
+        body = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self._lock:
+            # do not cache a text rendered from samples replaced in the meantime
+            if version == self._version:
+                self._cache = body
+        return body
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 17:40
+#           @file: jobs.py
+#          @brief: Cooperative cancellation and progress reporting of background jobs
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 17:40:00
+# *****************************************************
+
+import time
+import threading
+
+
+class JobCancelled(Exception):
+    """ Raised in a job when it is cancelled """
+    pass
+
+
+class JobControl(object):
+    """ Shared state of a background job and its owner
+
+    The owner calls `cancel` from any thread. The job passes `progress` and `partial` as callbacks to the
+    functions it runs: they raise `JobCancelled` once the job is cancelled, so cancellation takes effect at
+    the next report (e.g. the next block of a log). Progress is forwarded to `on_progress` at most every
+    `min_interval` seconds.
+    """
+
+    def __init__(self, on_progress=None, on_partial=None, min_interval=0.1):
+        """
+        :param on_progress: callable or None
+            Called with (done, total)
+        :param on_partial: callable or None
+            Called with a partial result
+        """
+        self.on_progress = on_progress
+        self.on_partial = on_partial
+        self.min_interval = min_interval
+        self._cancelled = threading.Event()
+        self._reported = 0.
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def progress(self, done, total):
+        self.check()
+        now = time.monotonic()
+        if self.on_progress is not None and (now - self._reported >= self.min_interval or done >= total):
+            self._reported = now
+            self.on_progress(done, total)
+
+    def partial(self, result):
+        self.check()
+        if self.on_partial is not None:
+            self.on_partial(result)
@@ -0,0 +1,189 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 09:12
+#           @file: leak.py
+#          @brief: Vectorized leak detection over parsed memory logs
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 09:12:00
+# *****************************************************
+
+import numpy as np
+import pandas as pd
+
+_MB = 1024 * 1024
+
+
+def _theil_sen(t: np.ndarray, y: np.ndarray, batch=4096) -> np.ndarray:
+    """ Row-wise Theil-Sen slope of the (G, K) matrices t and y, NaN cells are ignored """
+    k = t.shape[1]
+    iu, ju = np.triu_indices(k, 1)
+    rst = np.full(t.shape[0], np.nan)
+    for s in range(0, t.shape[0], batch):
+        dt = t[s:s + batch, ju] - t[s:s + batch, iu]
+        dy = y[s:s + batch, ju] - y[s:s + batch, iu]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = np.where(dt > 0, dy / dt, np.nan)
+        valid = ~np.all(np.isnan(slopes), axis=1)
+        rst[s:s + batch][valid] = np.nanmedian(slopes[valid], axis=1)
+    return rst
+
+
+def _last_valid(m: np.ndarray) -> np.ndarray:
+    """ The last non NaN value of every row """
+    idx = m.shape[1] - 1 - np.argmax(~np.isnan(m[:, ::-1]), axis=1)
+    return m[np.arange(m.shape[0]), idx]
+
+
+def _change_point(t: np.ndarray, y: np.ndarray, min_z=3., min_side=3):
+    """ Locate the strongest change of growth rate of every row with CUSUM of the segment slopes
+
+    The change leaves at least `min_side` segments on both sides, and is kept only if the mean slopes before
+    and after differ by more than `min_z` standard errors of their difference (Welch): the slopes of a steady
+    growth differ by noise only.
+    :return: Tuple
+        index of the change point (-1 if there is none), slope before and slope after (NaN if no change)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.diff(y, axis=1) / np.diff(t, axis=1)
+    s[~np.isfinite(s)] = np.nan
+    n = np.sum(~np.isnan(s), axis=1)
+    ok = n >= 2 * min_side
+    pos = np.full(t.shape[0], -1)
+    before = np.full(t.shape[0], np.nan)
+    after = np.full(t.shape[0], np.nan)
+    if not np.any(ok):
+        return pos, before, after
+
+    s = s[ok]
+    centered = s - np.nanmean(s, axis=1)[:, None]
+    cusum = np.nancumsum(centered, axis=1)
+    n_left = np.cumsum(~np.isnan(s), axis=1)
+    inside = (n_left >= min_side) & (n[ok][:, None] - n_left >= min_side)
+    k = np.argmax(np.where(inside, np.abs(cusum), -1.), axis=1)
+    left = np.arange(s.shape[1])[None, :] <= k[:, None]
+    s_before, s_after = np.where(left, s, np.nan), np.where(left, np.nan, s)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m_before, m_after = np.nanmean(s_before, axis=1), np.nanmean(s_after, axis=1)
+        se = np.sqrt(np.nanvar(s_before, axis=1) / np.sum(~np.isnan(s_before), axis=1) +
+                     np.nanvar(s_after, axis=1) / np.sum(~np.isnan(s_after), axis=1))
+        # rounding errors of a steady growth are not a change, a noiseless change has a huge score
+        se = np.maximum(se, 1e-9 * np.nanmean(np.abs(s), axis=1))
+        significant = np.abs(m_after - m_before) / se > min_z
+    rows = np.flatnonzero(ok)[significant]
+    pos[rows] = k[significant] + 1
+    before[rows] = m_before[significant]
+    after[rows] = m_after[significant]
+    return pos, before, after
+
+
+def leak_report(d: pd.DataFrame, threshold=None, bins=16, drop_ratio=0.2, min_drops=2,
+                min_drop_mb=4.) -> pd.DataFrame:
+    """ Leak statistics of every process group in a parsed memory log
+
+    Samples of each group are split into `bins` equally populated bins, the medians and the minima
+    of the bins are then used to estimate the trend of the usage and the trend of the baseline.
+    All the groups are handled at once, there is no python loop over groups.
+
+    :param d: pd.DataFrame
+        Memory log returned by `parse_memory_log`, the `Process`, `Time` and `rss` columns are used
+    :param threshold: float or None
+        Memory usage threshold in MB for the time-to-threshold forecast
+    :param bins: int
+        Number of bins of each group used by the robust estimators
+    :param drop_ratio: float
+        A drop of rss larger than `drop_ratio` times the range of the group is treated as a release (GC)
+    :param min_drop_mb: float
+        Smallest drop (MB) treated as a release. Drops must also exceed 5 times the noise of the group
+        (robust scale of the differences of rss), so the jitter of a steady process is no release
+    :param min_drops: int
+        Minimal number of releases for a group to be treated as sawtooth
+    :return: pd.DataFrame
+        One row per process, slopes are in MB/hour. The change time and the slopes around it are NaT/NaN
+        when the growth rate does not change significantly
+    """
+    columns = ['samples', 'start', 'end', 'hours', 'last_mb', 'peak_mb',
+               'slope_mb_h', 'baseline_slope_mb_h', 'drops', 'sawtooth', 'trend_mb_h',
+               'change_time', 'slope_before_mb_h', 'slope_after_mb_h', 'hours_to_threshold']
+    if d.empty:
+        return pd.DataFrame(columns=columns)
+
+    gid, keys = pd.factorize(d['Process'], sort=True)
+    t0 = d['Time'].min()
+    t = ((d['Time'] - t0).dt.total_seconds() / 3600).to_numpy(dtype=np.float64)
+    y = d['rss'].to_numpy(dtype=np.float64) / _MB
+    order = np.lexsort((t, gid))
+    gid, t, y = gid[order], t[order], y[order]
+
+    n_groups = len(keys)
+    count = np.bincount(gid, minlength=n_groups)
+    first = np.concatenate(([0], np.cumsum(count)[:-1]))
+    last = first + count - 1
+
+    # equally populated bins inside every group
+    rank = np.arange(len(gid)) - first[gid]
+    b = rank * bins // count[gid]
+    flat = gid * bins + b
+    frame = pd.DataFrame({'k': flat, 't': t, 'y': y}).groupby('k', sort=False)
+    med = frame.median()
+    low = frame['y'].min()
+    shape = (n_groups, bins)
+    t_med = np.full(shape, np.nan)
+    y_med = np.full(shape, np.nan)
+    y_low = np.full(shape, np.nan)
+    t_med.flat[med.index.to_numpy()] = med['t'].to_numpy()
+    y_med.flat[med.index.to_numpy()] = med['y'].to_numpy()
+    y_low.flat[low.index.to_numpy()] = low.to_numpy()
+
+    slope = _theil_sen(t_med, y_med)
+    baseline_slope = _theil_sen(t_med, y_low)
+
+    # sawtooth detection, count significant drops inside every group
+    peak = np.maximum.reduceat(y, first)
+    span = peak - np.minimum.reduceat(y, first)
+    dy = np.diff(y)
+    same = gid[1:] == gid[:-1]
+    noise = np.zeros(n_groups)
+    if same.any():
+        mad = pd.Series(np.abs(dy[same])).groupby(gid[1:][same]).median()
+        noise[mad.index.to_numpy()] = 1.4826 * mad.to_numpy()
+    limit = np.maximum(np.maximum(drop_ratio * span, min_drop_mb), 5 * noise)
+    drop = same & (dy < -limit[gid[1:]])
+    drops = np.bincount(gid[1:][drop], minlength=n_groups)
+    sawtooth = drops >= min_drops
+
+    # the baseline is the meaningful trend of a sawtooth curve
+    y_trend = np.where(sawtooth[:, None], y_low, y_med)
+    trend = np.where(sawtooth, baseline_slope, slope)
+    pos, before, after = _change_point(t_med, y_trend)
+    t_change = np.where(pos >= 0, t_med[np.arange(n_groups), np.maximum(pos, 0)], np.nan)
+
+    level = _last_valid(y_trend)
+    if threshold is None:
+        to_threshold = np.full(n_groups, np.nan)
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            to_threshold = np.where(trend > 0, (threshold - level) / trend, np.inf)
+        to_threshold = np.where(level >= threshold, 0., to_threshold)
+        to_threshold[np.isnan(trend)] = np.nan
+
+    rst = pd.DataFrame({
+        'samples': count,
+        'start': t0 + pd.to_timedelta(t[first], unit='h').round('ms'),
+        'end': t0 + pd.to_timedelta(t[last], unit='h').round('ms'),
+        'hours': t[last] - t[first],
+        'last_mb': y[last],
+        'peak_mb': peak,
+        'slope_mb_h': slope,
+        'baseline_slope_mb_h': baseline_slope,
+        'drops': drops,
+        'sawtooth': sawtooth,
+        'trend_mb_h': trend,
+        'change_time': t0 + pd.to_timedelta(t_change, unit='h').round('ms'),
+        'slope_before_mb_h': before,
+        'slope_after_mb_h': after,
+        'hours_to_threshold': to_threshold,
+    }, index=pd.Index(keys, name='Process'))
+    return rst[columns]
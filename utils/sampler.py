@@ -0,0 +1,422 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 13:02
+#           @file: sampler.py
+#          @brief: Sample memory usage of a process by name, shared by the GUI and the agent
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 13:02:00
+# *****************************************************
+
+import os
+import re
+import math
+import time
+import psutil
+import datetime
+import collections
+import numpy as np
+from typing import Dict, List, Tuple, Union
+
+Sample = collections.namedtuple('Sample', ['ts', 'pid', 'name', 'create_time', 'rss', 'vms', 'extra'])
+Sample.__new__.__defaults__ = ({},)
+
+# the record written to the memory log for every sample, parsed by `parse_log`
+RECORD_FORMAT = '[{}]-[{}]-[{}] - [{}, {}]'
+# extra fields of a sample follow the record as ` {name=value, ...}`
+EXTRA_FORMAT = ' {{{}}}'
+# format of the memory log, timestamps have milliseconds
+LOG_FORMAT = '%(asctime)s.%(msecs)03d %(levelname)-8s: %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def format_record(s: Sample) -> str:
+    record = RECORD_FORMAT.format(s.pid, s.name, s.create_time, s.rss, s.vms)
+    if s.extra:
+        record += EXTRA_FORMAT.format(', '.join('{}={}'.format(k, s.extra[k]) for k in sorted(s.extra)))
+    return record
+
+
+def oom_headroom(sys_available, cg_current, cg_max):
+    """ Memory a process can still take: the headroom to the limit of its cgroup when it is limited
+    and the available system memory, the smaller of both. Works on scalars and arrays, NaN for unknown.
+    """
+    cg_max = np.asarray(cg_max, dtype=np.float64)
+    cg = np.where(cg_max > 0, cg_max - np.asarray(cg_current, dtype=np.float64), np.nan)
+    return np.fmin(np.asarray(sys_available, dtype=np.float64), cg)
+
+
+def _cgroup2_root() -> str:
+    """ Mount point of the cgroup v2 hierarchy, e.g. `/sys/fs/cgroup/unified` on hybrid systems """
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    return fields[1]
+    except OSError:
+        pass
+    return '/sys/fs/cgroup'
+
+
+class MemoryContext(object):
+    """ System wide memory and memory of the cgroup (v2) of a process, recorded as extra fields of its samples
+
+    Fields are `sys_available`, `sys_used`, `swap_used` and, when the process is in a cgroup v2 with the memory
+    controller, `cg_current`, `cg_max` (0 when unlimited) and `cg_<key>` of `CGROUP_STAT_KEYS` in bytes.
+    The files of the cgroup are opened once per process and read again at every sample.
+    """
+    CGROUP_FILES = ('memory.current', 'memory.max', 'memory.stat')
+    CGROUP_STAT_KEYS = ('anon', 'file', 'inactive_file')
+
+    def __init__(self, system=True, cgroup=True, cgroup_root=None):
+        self.system = system
+        self.cgroup = cgroup and os.path.isdir('/proc')
+        self._root = cgroup_root
+        self._fds = {}  # type: Dict[str, int]
+
+    def attach(self, pid: int):
+        """ Open the cgroup files of the process, the files of the previous process are closed """
+        self.close()
+        if not self.cgroup:
+            return
+        try:
+            with open('/proc/{}/cgroup'.format(pid)) as f:
+                path = next((line[3:].strip() for line in f if line.startswith('0::')), None)
+            if path is None:
+                return
+            if self._root is None:
+                self._root = _cgroup2_root()
+            folder = os.path.join(self._root, path.lstrip('/'))
+            for name in self.CGROUP_FILES:
+                self._fds[name] = os.open(os.path.join(folder, name), os.O_RDONLY)
+        except OSError:
+            # no cgroup v2 or no memory controller
+            self.close()
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def _read(self, name) -> str:
+        return os.pread(self._fds[name], 65536, 0).decode('ascii')
+
+    def read(self) -> Dict[str, int]:
+        rst = {}
+        if self.system:
+            vm = psutil.virtual_memory()
+            rst['sys_available'] = vm.available
+            rst['sys_used'] = vm.total - vm.available
+            rst['swap_used'] = psutil.swap_memory().used
+        if self._fds:
+            try:
+                rst['cg_current'] = int(self._read('memory.current'))
+                limit = self._read('memory.max').strip()
+                rst['cg_max'] = 0 if limit == 'max' else int(limit)
+                stat = dict(line.split(' ', 1) for line in self._read('memory.stat').splitlines())
+                for key in self.CGROUP_STAT_KEYS:
+                    if key in stat:
+                        rst['cg_' + key] = int(stat[key])
+            except (OSError, ValueError):
+                self.close()
+        return rst
+
+
+class SmapsBreakdown(object):
+    """ Memory of a process by class of mapping, read from `/proc/<pid>/smaps_rollup` (Linux 4.14+)
+
+    Every sample gets the proportional set size of anonymous, file backed and shared memory mappings and the
+    swapped out memory, as fields `sm_anon`, `sm_file`, `sm_shmem` and `sm_swap` (bytes, see `BREAKDOWN_KEYS`).
+    Kernels older than 5.2 have no proportional split, `sm_anon` is then the resident anonymous memory and
+    `sm_file` the rest of rss, shared memory included.
+
+    When `full_interval` is set, the full `/proc/<pid>/smaps` is walked at most every `full_interval` seconds
+    for the resident memory of every class of mapping `map_<class>` (see `MAPPING_CLASSES`) and the number
+    of mappings `map_count`, the fields of the last walk are added to every sample. The walk costs a few
+    milliseconds per thousand mappings, it is spaced so that it takes at most `max_load` of the time of the
+    sampler whatever the number of mappings.
+    Files are read into buffers reused from one sample to the next.
+    """
+    BREAKDOWN_KEYS = ('sm_anon', 'sm_file', 'sm_shmem', 'sm_swap')
+    MAPPING_CLASSES = ('heap', 'stack', 'anon', 'file', 'shmem')
+    _ROLLUP_REGEX = re.compile(rb'^(\w+): +(\d+) kB$', re.M)
+    # header of a mapping (group 1 is the path, empty for anonymous memory) or its resident size, the
+    # leading newline is much faster to scan for than a line start, the buffer starts with one
+    _SMAPS_REGEX = re.compile(rb'\n(?:[0-9a-f]+-[0-9a-f]+ \S+ \S+ \S+ \d+ *(.*)|Rss: +(\d+) kB)$', re.M)
+    # shared memory, /dev/zero for shared anonymous mappings
+    _SHMEM_PREFIXES = (b'/dev/shm/', b'/dev/zero', b'/SYSV', b'/memfd:')
+
+    def __init__(self, full_interval=0., max_load=0.01):
+        """
+        :param full_interval: float
+            Shortest interval (second) between two walks of the full smaps, 0 to disable
+        :param max_load: float
+            Largest share of the time spent in the walks of the full smaps
+        """
+        self.full_interval = full_interval
+        self.max_load = max_load
+        self._fds = {}  # type: Dict[str, int]
+        self._buffers = {}  # type: Dict[str, bytearray]
+        self._next_full = 0.
+        self._full = {}  # type: Dict[str, int]
+        self._classes = {}  # type: Dict[bytes, str]
+
+    def attach(self, pid: int):
+        """ Open the smaps files of the process, the files of the previous process are closed """
+        self.close()
+        names = ('smaps_rollup', 'smaps') if self.full_interval > 0 else ('smaps_rollup',)
+        try:
+            for name in names:
+                self._fds[name] = os.open('/proc/{}/{}'.format(pid, name), os.O_RDONLY)
+        except OSError:
+            # not Linux, kernel without smaps_rollup or no permission
+            self.close()
+        self._next_full = 0.
+        self._full = {}
+        # paths of the previous process, e.g. of memfd or deleted files, are not kept
+        self._classes = {}
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def _read(self, name, start=0) -> int:
+        """ Read the whole file into its buffer from `start`, the buffer is grown as needed
+        :return: int
+            End of the content in the buffer
+        """
+        fd = self._fds[name]
+        buf = self._buffers.get(name)
+        if buf is None:
+            buf = self._buffers[name] = bytearray(4096)
+        size = start
+        while True:
+            n = os.preadv(fd, [memoryview(buf)[size:]], size - start)
+            if n == 0:
+                return size
+            size += n
+            if size == len(buf):
+                buf.extend(bytes(len(buf)))
+
+    def _mapping_class(self, path: bytes) -> Union[str, None]:
+        cls = self._classes.get(path)
+        if cls is None:
+            if not path or path.startswith(b'[anon'):
+                cls = 'anon'
+            elif path == b'[heap]':
+                cls = 'heap'
+            elif path.startswith(b'[stack'):
+                cls = 'stack'
+            elif path.startswith(b'['):
+                # vdso, vvar and the like
+                cls = ''
+            elif path.startswith(self._SHMEM_PREFIXES):
+                cls = 'shmem'
+            else:
+                cls = 'file'
+            self._classes[path] = cls
+        return cls
+
+    def _read_full(self) -> Dict[str, int]:
+        size = self._read('smaps', 1)
+        self._buffers['smaps'][0] = ord('\n')
+        rss = dict.fromkeys(self.MAPPING_CLASSES, 0)
+        count = 0
+        cls = ''
+        for m in self._SMAPS_REGEX.finditer(self._buffers['smaps'], 0, size):
+            if m.group(2) is None:
+                cls = self._mapping_class(m.group(1))
+                count += 1
+            elif cls:
+                rss[cls] += int(m.group(2))
+        rst = {'map_' + cls: kb * 1024 for cls, kb in rss.items()}
+        rst['map_count'] = count
+        return rst
+
+    def read(self) -> Dict[str, int]:
+        rst = {}
+        if not self._fds:
+            return rst
+        try:
+            size = self._read('smaps_rollup')
+            fields = {m.group(1): int(m.group(2)) * 1024
+                      for m in self._ROLLUP_REGEX.finditer(self._buffers['smaps_rollup'], 0, size)}
+            if b'Pss_Anon' in fields:
+                rst['sm_anon'] = fields[b'Pss_Anon']
+                rst['sm_file'] = fields[b'Pss_File']
+                rst['sm_shmem'] = fields[b'Pss_Shmem']
+                rst['sm_swap'] = fields.get(b'SwapPss', fields[b'Swap'])
+            else:
+                rst['sm_anon'] = fields[b'Anonymous']
+                rst['sm_file'] = fields[b'Rss'] - fields[b'Anonymous']
+                rst['sm_swap'] = fields[b'Swap']
+            now = time.monotonic()
+            if 'smaps' in self._fds and now >= self._next_full:
+                self._full = self._read_full()
+                cost = time.monotonic() - now
+                self._next_full = now + max(self.full_interval, cost / self.max_load)
+            rst.update(self._full)
+        except (OSError, KeyError):
+            # the process exited
+            self.close()
+        return rst
+
+
+class ProcessSampler(object):
+    """ Sample memory usage of the process with given name
+
+    The process is looked up by name and cached, it is looked up again when it exits or is renamed.
+    """
+
+    def __init__(self, name: str, context: MemoryContext = None, breakdown: SmapsBreakdown = None):
+        """
+        :param context: MemoryContext or None
+            Set to record the system and cgroup memory in the extra fields of the samples
+        :param breakdown: SmapsBreakdown or None
+            Set to record the memory of the process by class of mapping in the extra fields of the samples
+        """
+        self.name = name
+        self.pid = None
+        self.create_time = ''
+        self.context = context
+        self.breakdown = breakdown
+        # sources of extra fields, they have the same attach/close/read interface
+        self._sources = [source for source in (context, breakdown) if source is not None]
+        self._process = None  # type: Union[None, psutil.Process]
+
+    def reset(self):
+        self.pid, self.create_time, self._process = None, '', None
+        for source in self._sources:
+            source.close()
+
+    def update_process(self) -> List[Tuple[str, int, str]]:
+        """ Check the cached process and look for a new one if needed
+        :return: List
+            Events ('lost', pid, create time) and ('found', pid, create time)
+        """
+        events = []
+        # try to check whether this id is still valid
+        if self._process is not None:
+            try:
+                if self._process.name() != self.name:
+                    self.reset()
+            except Exception:
+                events.append(('lost', self.pid, self.create_time))
+                self.reset()
+
+        # try to get a new pid
+        if self._process is None:
+            for proc in psutil.process_iter(attrs=['pid', 'name']):
+                if proc.info['name'] == self.name:
+                    self._process = proc
+                    self.pid = proc.info['pid']
+                    self.create_time = datetime.datetime.fromtimestamp(
+                        proc.create_time()).strftime('%Y-%m-%d %H:%M:%S')
+                    events.append(('found', self.pid, self.create_time))
+                    for source in self._sources:
+                        source.attach(self.pid)
+                    break
+        return events
+
+    def sample(self) -> Union[Sample, None]:
+        """ Sample memory usage of the cached process, None if there is no process or it exits """
+        if self._process is None:
+            return None
+        try:
+            memory_usage = self._process.memory_info()
+        except psutil.Error:
+            return None
+        extra = {}
+        for source in self._sources:
+            extra.update(source.read())
+        return Sample(time.time(), self.pid, self.name, self.create_time, memory_usage.rss, memory_usage.vms, extra)
+
+
+class AdaptiveInterval(object):
+    """ Sampling interval following the activity of the sampled value
+
+    The interval is chosen so that the value changes by about `change` between two samples: when the value moves
+    fast the interval drops at once (down to `min_interval`), when it is stable the interval grows by `backoff`
+    per sample (up to `max_interval`). Crossing `limit` drops the interval to `min_interval`.
+    Sampling starts at `min_interval` so the first samples are not delayed.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, change=1 << 20, limit=0, backoff=1.5):
+        """
+        :param change: int
+            Expected change of the value between two samples, in bytes
+        :param limit: int
+            Threshold of the value in bytes, 0 to disable
+        """
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.change = change
+        self.limit = limit
+        self.backoff = backoff
+        self.interval = self.min_interval
+        self._last = None
+
+    def reset(self):
+        self.interval = self.min_interval
+        self._last = None
+
+    def update(self, ts: float, value: int) -> float:
+        """ Feed a sample, return the interval (seconds) until the next one """
+        if self._last is not None:
+            last_ts, last_value = self._last
+            delta = abs(value - last_value)
+            dt = max(ts - last_ts, 1e-3)
+            if self.limit > 0 and (value >= self.limit) != (last_value >= self.limit):
+                interval = self.min_interval
+            elif delta > 0 and self.change * dt / delta < self.interval:
+                interval = self.change * dt / delta
+            else:
+                interval = self.interval * self.backoff
+            self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self._last = (ts, value)
+        return self.interval
+
+
+class TickScheduler(object):
+    """ Drift free schedule of sampling ticks on the monotonic clock
+
+    Tick k is due at start + k * interval whatever the time spent in the ticks and the latency of the timer,
+    so errors do not accumulate. A late tick is run at once, ticks missed by more than one interval (e.g. the
+    caller was stalled) are skipped and counted in `missed`, the phase of the schedule is kept.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.missed = 0
+        self._deadline = time.monotonic()
+
+    def start(self, interval=None) -> float:
+        """ Restart the schedule, the first tick is due now
+        :return: float
+            Delay in seconds until the first tick
+        """
+        if interval is not None:
+            self.interval = interval
+        self.missed = 0
+        self._deadline = time.monotonic()
+        return 0.
+
+    def next_delay(self, interval=None) -> float:
+        """ Schedule the next tick, `interval` changes the interval from now on, e.g. for adaptive sampling
+        :return: float
+            Delay in seconds until the next tick
+        """
+        if interval is not None:
+            self.interval = interval
+        self._deadline += self.interval
+        now = time.monotonic()
+        late = now - self._deadline
+        if late > self.interval > 0:
+            skipped = math.floor(late / self.interval)
+            self.missed += skipped
+            self._deadline += skipped * self.interval
+        return max(self._deadline - now, 0.)
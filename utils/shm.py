@@ -0,0 +1,261 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 18:30
+#           @file: shm.py
+#          @brief: Hand frames over from worker processes through shared memory
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 18:30:00
+# *****************************************************
+
+"""
+A worker process writes the columns of a frame into shared memory blocks with `export_frame` and returns
+the small, picklable `SharedFrame`. The reader attaches the blocks and gets a frame of zero-copy NumPy views,
+it owns the blocks from then on and calls `release` when the frame is not needed any more.
+
+When the number of rows of every file is known beforehand (see `convert_log.scan_memory_logs`), the reader
+`allocate`s the blocks of the whole load instead and the workers `write` their rows in place, so the frame of
+several files is not concatenated.
+
+`release` unlinks the blocks at once, their memory is returned when the last mapping is closed: views still
+referenced (e.g. by a chart being drawn) keep the mapping alive, it is closed by a later `release`.
+"""
+
+import os
+import uuid
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict
+
+# blocks exported by this (worker) process, they are kept open until the process exits so the reader
+# can attach them on Windows, where a block is destroyed with its last handle
+_exported = []
+# mappings released while views of them were still referenced
+_retired = []
+_retired_lock = threading.Lock()
+# dtypes of the columns of an allocated frame, extra columns are float64
+_TIME_DTYPE = np.dtype('datetime64[us]')
+_EXTRA_DTYPE = np.dtype(np.float64)
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """ Keep the resource tracker of this process from unlinking a block owned by another process """
+    if os.name == 'posix':
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+
+def _close_retired():
+    with _retired_lock:
+        for shm in list(_retired):
+            try:
+                shm.close()
+                _retired.remove(shm)
+            except BufferError:
+                pass
+
+
+class SharedFrame(object):
+    """ Handle of a `Process`, `Time`, `rss`, `vms` (and extra fields) frame stored in shared memory blocks
+
+    `Process` is stored as categorical codes, the labels are pickled with the handle.
+    """
+
+    def __init__(self, columns: dict, labels: list, length: int):
+        """
+        :param columns: dict
+            column -> (name of the block, dtype)
+        """
+        self.columns = columns
+        self.labels = labels
+        self.length = length
+        # first row of the blocks, set for the rows written by `write`
+        self.start = 0
+        # prefix of the names of the extra blocks of an allocated frame
+        self.prefix = None
+        self._blocks = {}  # type: Dict[str, shared_memory.SharedMemory]
+        self._released = False
+
+    @classmethod
+    def allocate(cls, length: int, labels: list) -> 'SharedFrame':
+        """ Create the blocks of a frame of given length in this process, the caller owns them
+        Rows are written by `write`, extra columns are added by the writers.
+        """
+        dtypes = {
+            'Process': pd.Categorical([], categories=labels).codes.dtype,
+            'Time': _TIME_DTYPE,
+            'rss': np.dtype(np.int64),
+            'vms': np.dtype(np.int64),
+        }
+        frame = cls({}, list(labels), length)
+        frame.prefix = 'mm{}'.format(uuid.uuid4().hex[:12])
+        try:
+            for column, dtype in dtypes.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(length * dtype.itemsize, 1))
+                frame._blocks[shm.name] = shm
+                frame.columns[column] = (shm.name, dtype.str)
+        except BaseException:
+            frame.release()
+            raise
+        return frame
+
+    def extra_block(self, column: str) -> str:
+        """ Name of the block of an extra column of an allocated frame, the same in every process """
+        return '{}_{:08x}'.format(self.prefix, zlib.crc32(column.encode('utf-8')))
+
+    def write(self, d: pd.DataFrame, start: int) -> 'SharedFrame':
+        """ Write the rows of a `Process`, `Time`, `rss`, `vms` frame at `start` of an allocated frame, in a worker
+        process. The block of an extra column is created by the first writer having it, it is zero filled:
+        the reader fills the rows of the other writers with `fill_missing`.
+
+        :return: SharedFrame
+            Handle of the written rows, for `add_rows` in the reader
+        """
+        if start + len(d) > self.length:
+            raise ValueError('Rows {}:{} out of a frame of {} rows'.format(start, start + len(d), self.length))
+        values = {
+            'Process': pd.Categorical(d['Process'], categories=self.labels).codes,
+            'Time': pd.to_datetime(d['Time']).to_numpy(dtype=_TIME_DTYPE),
+            'rss': d['rss'].to_numpy(dtype=np.int64),
+            'vms': d['vms'].to_numpy(dtype=np.int64),
+        }
+        columns = dict(self.columns)
+        for c in d.columns[4:]:
+            values[c] = d[c].to_numpy(dtype=_EXTRA_DTYPE)
+            columns[c] = (self.extra_block(c), _EXTRA_DTYPE.str)
+        for column, a in values.items():
+            name, dtype = columns[column]
+            try:
+                shm = shared_memory.SharedMemory(name=name, create=True,
+                                                 size=max(self.length * np.dtype(dtype).itemsize, 1))
+                created = True
+                # the reader owns the block, see `export_frame`
+                _untrack(shm)
+            except FileExistsError:
+                # the resource tracker is the one of the reader, which keeps its registration
+                shm = shared_memory.SharedMemory(name=name)
+                created = False
+            np.ndarray(self.length, dtype=dtype, buffer=shm.buf)[start:start + len(a)] = a
+            if created:
+                # kept open until the process exits, see `_exported`
+                _exported.append(shm)
+            else:
+                shm.close()
+        rows = SharedFrame(columns, self.labels, len(d))
+        rows.start = start
+        return rows
+
+    def add_rows(self, rows: 'SharedFrame') -> pd.DataFrame:
+        """ Take the rows written by a worker process into this allocated frame, with their extra columns
+        :return: pd.DataFrame
+            Views of the rows
+        """
+        for column, (name, dtype) in rows.columns.items():
+            if column not in self.columns:
+                self._blocks[name] = shared_memory.SharedMemory(name=name)
+                self.columns[column] = (name, dtype)
+        return self._views(list(rows.columns), rows.start, rows.length)
+
+    def fill_missing(self, written: list):
+        """ Fill the rows of extra columns not written by a worker process with NaN
+        :param written: List
+            Handles returned by `write`
+        """
+        for column in list(self.columns)[4:]:
+            for rows in written:
+                if column not in rows.columns:
+                    self._array(column)[rows.start:rows.start + rows.length] = np.nan
+
+    def _array(self, column) -> np.ndarray:
+        name, dtype = self.columns[column]
+        # views hold an export of the buffer, so the mapping can not be closed under them
+        return np.frombuffer(self._blocks[name].buf, dtype=dtype, count=self.start + self.length)
+
+    def _views(self, columns, start, length) -> pd.DataFrame:
+        arrays = {c: self._array(c)[start:start + length] for c in columns}
+        arrays['Process'] = pd.Categorical.from_codes(arrays['Process'], self.labels)
+        return pd.DataFrame(arrays, columns=columns, copy=False)
+
+    def __getstate__(self):
+        return {'columns': self.columns, 'labels': self.labels, 'length': self.length, 'start': self.start,
+                'prefix': self.prefix}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._blocks = {}
+        self._released = False
+
+    def attach(self) -> pd.DataFrame:
+        """ Attach the blocks, the caller owns them and must `release` them
+        :return: pd.DataFrame
+            Columns are views of the blocks
+        """
+        for name, _ in self.columns.values():
+            if name not in self._blocks:
+                self._blocks[name] = shared_memory.SharedMemory(name=name)
+        # extra columns are sorted, as in `parse_log.to_process_frame`
+        columns = list(self.columns)
+        return self._views(columns[:4] + sorted(columns[4:]), self.start, self.length)
+
+    def release(self):
+        """ Unlink the blocks, attached or not, mappings still viewed are closed by a later release """
+        if self._released:
+            return
+        self._released = True
+        blocks = []
+        for name, _ in self.columns.values():
+            shm = self._blocks.get(name)
+            try:
+                if shm is None:
+                    shm = shared_memory.SharedMemory(name=name)
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            if shm is not None:
+                blocks.append(shm)
+        self._blocks = {}
+        with _retired_lock:
+            _retired.extend(blocks)
+        _close_retired()
+
+
+def release_all(frames: list):
+    """ Release the shared frames of the list and empty it """
+    while frames:
+        try:
+            frame = frames.pop()
+        except IndexError:
+            break
+        frame.release()
+    _close_retired()
+
+
+def export_frame(d: pd.DataFrame) -> SharedFrame:
+    """ Write a `Process`, `Time`, `rss`, `vms` frame to new shared memory blocks, in a worker process
+    Extra columns (see `parse_log.to_process_frame`) are numeric, they are written as they are.
+
+    The blocks are handed over to the reader: they are not unlinked when this process exits.
+    """
+    process = pd.Categorical(d['Process'])
+    values = {
+        'Process': process.codes,
+        # an empty frame has untyped columns
+        'Time': pd.to_datetime(d['Time']).to_numpy(),
+        'rss': d['rss'].to_numpy(dtype=np.int64),
+        'vms': d['vms'].to_numpy(dtype=np.int64),
+    }
+    for c in d.columns[4:]:
+        values[c] = d[c].to_numpy(dtype=np.float64)
+    columns = {}
+    for column, a in values.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[:] = a
+        # the reader owns the block, the resource tracker of this process must not unlink it
+        _untrack(shm)
+        _exported.append(shm)
+        columns[column] = (shm.name, a.dtype.str)
+    return SharedFrame(columns, list(process.categories), len(d))
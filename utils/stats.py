@@ -0,0 +1,204 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 10:05
+#           @file: stats.py
+#          @brief: O(1) streaming statistics and threshold alerts of sampled memory usage
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 10:05:00
+# *****************************************************
+
+import os
+import math
+import shlex
+import logging
+import subprocess
+from typing import List, Union
+
+
+class P2Quantile(object):
+    """ P-square online quantile estimator (Jain & Chlamtac, 1985), constant memory """
+
+    def __init__(self, p: float):
+        self.p = p
+        self._q = []  # marker heights
+        self._n = [0, 1, 2, 3, 4]  # marker positions
+        self._np = [0., 2 * p, 4 * p, 2 + 2 * p, 4.]  # desired positions
+        self._dn = [0., p / 2, p, (1 + p) / 2, 1.]
+
+    def add(self, x: float):
+        q = self._q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        n = self._n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        for i in (1, 2, 3):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # piece-wise parabolic prediction, fall back to linear one if it breaks monotonicity
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        q = self._q
+        if not q:
+            return math.nan
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+
+class RunningStats(object):
+    """ Running statistics of one sampled series
+
+    min/max/mean, Welford variance, EMA level and EMA slope (per hour) and P-square quantiles
+    are updated in O(1) time and memory per sample.
+    """
+
+    def __init__(self, tau=600., quantiles=(0.5, 0.95)):
+        """
+        :param tau: float
+            Time constant of the EMA in seconds
+        :param quantiles: Tuple
+            Probabilities of the tracked quantiles
+        """
+        self.tau = tau
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.
+        self._m2 = 0.
+        self.ema = math.nan
+        self.slope = 0.
+        self._last = None
+        self._quantiles = [P2Quantile(p) for p in quantiles]
+
+    def add(self, ts: float, x: float):
+        """
+        :param ts: float
+            Epoch time of the sample in seconds
+        :param x: float
+            Value of the sample
+        """
+        self.count += 1
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        for q in self._quantiles:
+            q.add(x)
+
+        if self._last is None:
+            self.ema = x
+        else:
+            t_prev, x_prev = self._last
+            dt = ts - t_prev
+            if dt > 0:
+                alpha = 1 - math.exp(-dt / self.tau)
+                self.ema += alpha * (x - self.ema)
+                self.slope += alpha * ((x - x_prev) / dt * 3600 - self.slope)
+        self._last = (ts, x)
+
+    @property
+    def var(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    @property
+    def quantiles(self) -> dict:
+        return {q.p: q.value for q in self._quantiles}
+
+
+class ThresholdAlert(object):
+    """ Edge triggered alerts on absolute memory usage and growth rate
+
+    An alert is raised once when a threshold is crossed and re-armed when the value goes back below it.
+    """
+
+    def __init__(self, rss_limit=0., growth_limit=0., min_samples=10, command=''):
+        """
+        :param rss_limit: float
+            Absolute rss threshold in MB, 0 to disable
+        :param growth_limit: float
+            Threshold of the EMA slope of rss in MB/hour, 0 to disable
+        :param min_samples: int
+            Growth alert is not checked before given number of samples
+        :param command: str
+            External command launched (without waiting) on every alert, the message is appended as the last argument
+        """
+        self.rss_limit = rss_limit
+        self.growth_limit = growth_limit
+        self.min_samples = min_samples
+        self.command = command
+        self._active = set()
+
+    def check(self, name: str, stats: RunningStats, rss: float) -> List[str]:
+        """ Check the latest sample (MB) of the series `name`, return messages of new alerts """
+        rst = []
+        if self.rss_limit > 0:
+            msg = self._edge((name, 'rss'), rss >= self.rss_limit,
+                             'rss of {} is {:.1f} MB, limit {} MB'.format(name, rss, self.rss_limit))
+            if msg:
+                rst.append(msg)
+        if self.growth_limit > 0 and stats.count >= self.min_samples:
+            msg = self._edge((name, 'growth'), stats.slope >= self.growth_limit,
+                             'rss of {} grows {:.2f} MB/h, limit {} MB/h'.format(
+                                 name, stats.slope, self.growth_limit))
+            if msg:
+                rst.append(msg)
+        for msg in rst:
+            self.notify(msg)
+        return rst
+
+    def reset(self):
+        self._active.clear()
+
+    def _edge(self, key, triggered: bool, msg: str) -> Union[str, None]:
+        if not triggered:
+            self._active.discard(key)
+            return None
+        if key in self._active:
+            return None
+        self._active.add(key)
+        return msg
+
+    def notify(self, msg: str):
+        logging.warning('Memory alert: {}'.format(msg))
+        if not self.command:
+            return
+        try:
+            # never wait for the command, the sampler must not be blocked
+            subprocess.Popen(shlex.split(self.command, posix=os.name != 'nt') + [msg],
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except Exception as e:
+            logging.error('Failed to run alert command {}. Error message is {}'.format(self.command, repr(e)))
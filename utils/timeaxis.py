@@ -0,0 +1,96 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 12:20
+#           @file: timeaxis.py
+#          @brief: Time axis of matplotlib charts with cached ticks and labels
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 12:20:00
+# *****************************************************
+
+import datetime
+import numpy as np
+import matplotlib.dates as mdates
+import matplotlib.ticker as mticker
+
+# matplotlib date number of the unix epoch, the epoch of date numbers depends on the version of matplotlib
+_EPOCH_NUM = mdates.date2num(datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+def epoch_to_num(ts):
+    """ Convert epoch seconds (scalar or array) to matplotlib date numbers """
+    return _EPOCH_NUM + np.asarray(ts, dtype=np.float64) / 86400.
+
+
+class CachedLocator(mticker.Locator):
+    """ Locator returning the cached ticks of the wrapped locator until the view interval changes """
+
+    def __init__(self, locator: mticker.Locator):
+        self._locator = locator
+        self._view = None
+        self._ticks = None
+
+    def set_axis(self, axis):
+        super().set_axis(axis)
+        self._locator.set_axis(axis)
+
+    def __call__(self):
+        view = tuple(self.axis.get_view_interval())
+        if view != self._view:
+            self._view = view
+            self._ticks = self._locator()
+        return self._ticks
+
+    def tick_values(self, vmin, vmax):
+        return self._locator.tick_values(vmin, vmax)
+
+    def nonsingular(self, v0, v1):
+        return self._locator.nonsingular(v0, v1)
+
+    def view_limits(self, vmin, vmax):
+        return self._locator.view_limits(vmin, vmax)
+
+
+class CachedFormatter(mticker.Formatter):
+    """ Formatter returning the cached labels of the wrapped formatter until the ticks change """
+
+    def __init__(self, formatter: mticker.Formatter):
+        self._formatter = formatter
+        self._values = None
+        self._labels = None
+
+    def set_axis(self, axis):
+        super().set_axis(axis)
+        self._formatter.set_axis(axis)
+
+    def format_ticks(self, values):
+        values = tuple(values)
+        if values != self._values:
+            self._values = values
+            self._labels = self._formatter.format_ticks(list(values))
+        return self._labels
+
+    def __call__(self, x, pos=None):
+        return self._formatter(x, pos)
+
+    def set_locs(self, locs):
+        self._formatter.set_locs(locs)
+
+    def get_offset(self):
+        return self._formatter.get_offset()
+
+
+def setup_time_axis(axis, tz=None):
+    """ Use cached auto date ticks and labels on the given axis (e.g. `ax.xaxis`)
+    :param tz: datetime.tzinfo or None
+        Time zone of the labels, local time zone if None
+    """
+    if tz is None:
+        tz = datetime.datetime.now().astimezone().tzinfo
+    locator = mdates.AutoDateLocator(tz=tz)
+    formatter = mdates.AutoDateFormatter(locator, tz=tz)
+    formatter.scaled[1. / 24] = '%m-%d %H:%M'
+    axis.set_major_locator(CachedLocator(locator))
+    axis.set_major_formatter(CachedFormatter(formatter))
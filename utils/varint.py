@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ******************************************************
+#         @author: Haifeng CHEN - optical.dlz@gmail.com
+# @date (created): 2026-10-19 13:10
+#           @file: varint.py
+#          @brief: Zigzag LEB128 variable length integers
+#       @internal:
+#        revision: 1
+#   last modified: 2026-10-19 13:10:00
+# *****************************************************
+
+import numpy as np
+from typing import Tuple
+
+
+def zigzag(n: int) -> int:
+    """ Map signed integers to unsigned ones, small magnitudes stay small: 0, -1, 1, -2 ... -> 0, 1, 2, 3 ... """
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def unzigzag(z: int) -> int:
+    return (z >> 1) ^ -(z & 1)
+
+
+def write_uvarint(out: bytearray, n: int):
+    """ Append an unsigned integer, 7 bits per byte, the high bit marks continuation """
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def write_svarint(out: bytearray, n: int):
+    write_uvarint(out, zigzag(n))
+
+
+def read_uvarint(buf, pos: int) -> Tuple[int, int]:
+    """ Read an unsigned integer at pos
+    :return: Tuple
+        value and the position after it
+    :raise IndexError
+        if the buffer ends inside of the integer
+    """
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def read_svarint(buf, pos: int) -> Tuple[int, int]:
+    n, pos = read_uvarint(buf, pos)
+    return unzigzag(n), pos
+
+
+def zigzag_array(a) -> np.ndarray:
+    """ Vectorized `zigzag` of an int64 array """
+    a = np.asarray(a, dtype=np.int64)
+    return ((a << 1) ^ (a >> 63)).astype(np.uint64)
+
+
+def unzigzag_array(z) -> np.ndarray:
+    z = np.asarray(z, dtype=np.uint64)
+    return (z >> np.uint64(1)).astype(np.int64) ^ -(z & np.uint64(1)).astype(np.int64)
+
+
+def encode_uvarints(v) -> bytes:
+    """ Vectorized encoding of an array of unsigned integers to concatenated varints """
+    v = np.asarray(v, dtype=np.uint64)
+    n_bytes = np.ones(len(v), dtype=np.int64)
+    for k in range(1, 10):
+        n_bytes += (v >> np.uint64(7 * k)) != 0
+    starts = np.cumsum(n_bytes) - n_bytes
+    owner = np.repeat(np.arange(len(v)), n_bytes)
+    pos = np.arange(int(n_bytes.sum())) - starts[owner]
+    out = ((v[owner] >> (7 * pos).astype(np.uint64)) & np.uint64(0x7f)).astype(np.uint8)
+    out[pos < n_bytes[owner] - 1] |= 0x80
+    return out.tobytes()
+
+
+def decode_uvarints(buf) -> np.ndarray:
+    """ Vectorized decoding of concatenated varints """
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    pos = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    chunks = (b & 0x7f).astype(np.uint64) << (7 * pos).astype(np.uint64)
+    return np.bitwise_or.reduceat(chunks, starts)